@@ -0,0 +1,199 @@
+import os
+import shutil
+import tempfile
+
+import h5py
+
+import hawk
+
+from . import hawk_synth
+from .common import SENSORS, fixture, use
+
+
+class Import:
+    """import hawk in a fresh interpreter"""
+
+    def timeraw_import(self):
+        return "import hawk"
+
+
+class Open:
+    """Opening a campaign and dereferencing a series file"""
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx):
+        use(fx)
+
+    def time_cold_open(self, fx):
+        data = hawk.SBW(fx["dir"])
+        data["LMS/BR_AR/01"].keys()
+        data.close()
+
+
+class Lookup:
+    """Path lookups through HawkGroup.__getitem__ (hawk.lookup)"""
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx):
+        use(fx)
+        self.data = hawk.SBW(fx["dir"])
+        self.test = self.data["LMS/BR_AR/01"]
+        self.paths = [
+            f"LMS/BR_AR/{t:02d}/{s}/frf" for t in range(1, 6) for s in SENSORS
+        ]
+        hawk.index(self.data)
+        self.unpooled = hawk.SBW(fx["dir"], pool_size=0)
+        self.plain = h5py.File(os.path.join(fx["dir"], "SBW_header.hdf5"), "r")
+
+    def time_absolute_lookup(self, fx):
+        for p in self.paths:
+            self.data[p]
+
+    def time_absolute_lookup_unpooled(self, fx):
+        for p in self.paths:
+            self.unpooled[p]
+
+    def time_header_lookup(self, fx):
+        for _ in range(100):
+            self.data["LMS/xData/freq"]
+
+    def time_header_lookup_plain_h5py(self, fx):
+        # hawk must not slow down h5py use outside of its own objects
+        for _ in range(100):
+            self.plain["LMS/xData/freq"]
+
+    def time_relative_lookup(self, fx):
+        for s in SENSORS:
+            self.test[f"{s}/frf"]
+
+    def time_index_build(self, fx):
+        hawk._indexes.clear()
+        hawk.index(self.data, persist=False)
+
+    def time_index_warm(self, fx):
+        hawk.index(self.data)
+
+
+class Slicing:
+    """Bulk loads of many (test, channel) datasets"""
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx):
+        use(fx)
+        self.sbw = hawk.SBW(fx["dir"])
+        self.fst = hawk.FST(fx["dir"])
+        self.grid = [
+            [f"LMS/BR_AR/{t:02d}/{s}/frf" for s in SENSORS] for t in range(1, 6)
+        ]
+        self.tests, self.channels = hawk.get_FST_metadata(fx["dir"])
+        self.band = hawk.axis_rows(self.sbw, "LMS", 10, 20)
+        self.frf = self.sbw["LMS/BR_AR/01/EXH/frf"]
+
+    def time_stack(self, fx):
+        hawk.stack(self.sbw, self.grid)
+
+    def time_stack_band(self, fx):
+        hawk.stack(self.sbw, self.grid, rows=self.band)
+
+    def time_repeats_one_by_one(self, fx):
+        [self.frf[:, i] for i in range(self.frf.shape[1])]
+
+    def time_repeats_read_many(self, fx):
+        self.frf.read_many([(slice(None), i) for i in range(self.frf.shape[1])])
+
+    def time_slice_from_dfs(self, fx):
+        hawk.slice_from_dfs(self.fst, self.tests, self.channels)
+
+    def time_select(self, fx):
+        hawk.select(self.fst, tests="HS_WN", sensors="SW_*")
+
+    def peakmem_stack(self, fx):
+        hawk.stack(self.sbw, self.grid)
+
+
+class Metadata:
+    """setup()/describe() metadata resolution and tree listings"""
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx):
+        use(fx)
+        self.data = hawk.SBW(fx["dir"])
+        self.dsets = [
+            self.data[f"LMS/BR_AR/{t:02d}/{s}/frf"]
+            for t in range(1, 6)
+            for s in SENSORS
+        ]
+        for d in self.dsets:
+            d.setup()
+
+    def time_setup_cold(self, fx):
+        hawk._attrs_cache.clear()
+        for d in self.dsets:
+            d.setup()
+
+    def time_setup_warm(self, fx):
+        for d in self.dsets:
+            d.setup()
+
+    def time_describe(self, fx):
+        for d in self.dsets:
+            d.describe()
+
+    def time_explore(self, fx):
+        hawk._indexes.clear()
+        self.data.explore(10)
+
+    def time_iter_tree_indexed(self, fx):
+        hawk.index(self.data)
+        for _ in hawk.iter_tree(self.data, 10):
+            pass
+
+
+class Download:
+    """Download and md5 verification throughput against a local stand-in server"""
+
+    number = 1
+    repeat = 5
+    warmup_time = 0
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx):
+        self.lut = {k: v for k, v in fx["lut"].items() if k.startswith("BR_AR")}
+        self.server = hawk_synth.stand_in(fx["dir"], self.lut)
+        self.server.__enter__()
+        self.dst = tempfile.mkdtemp()
+        self.src = fx["dir"]
+
+    def teardown(self, fx):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.dst)
+
+    def time_prefetch(self, fx):
+        hawk.prefetch("BR_AR_*", self.dst, workers=4, verbose=False)
+
+    def track_prefetch_MBps(self, fx):
+        progress = hawk.Progress(len(self.lut), verbose=False)
+        for key in self.lut:
+            hawk.fetch(key, self.dst, progress)
+        return progress.rate / 1e6
+
+    def time_verify_cold(self, fx):
+        for key in self.lut:
+            stamp = os.path.join(self.src, key + ".hdf5.stamp")
+            if os.path.isfile(stamp):
+                os.remove(stamp)
+            hawk.verify(key, self.src)
+
+    def time_verify_warm(self, fx):
+        for key in self.lut:
+            hawk.verify(key, self.src)
@@ -0,0 +1,26 @@
+import hawk
+
+from .common import SENSORS, fixture, use
+
+
+class ParallelStack:
+    """Scaling of hawk.stack with the number of worker processes"""
+
+    params = [1, 2, 4, 8]
+    param_names = ["workers"]
+    timeout = 600
+
+    def setup_cache(self):
+        return fixture()
+
+    def setup(self, fx, workers):
+        use(fx)
+        self.data = hawk.SBW(fx["dir"])
+        self.grid = [
+            [f"LMS/BR_AR/{rep:02d}/{sensor}/frf" for sensor in SENSORS]
+            for rep in range(1, 6)
+        ]
+        hawk.stack(self.data, self.grid, workers=workers)  # spin up the pool
+
+    def time_stack(self, fx, workers):
+        hawk.stack(self.data, self.grid, workers=workers)
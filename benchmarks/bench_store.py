@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+import h5py
+import numpy as np
+
+import hawk
+
+from .common import SENSORS, fixture, use
+
+
+class Consolidated:
+    """Cold open and random single-repeat reads, header + series files vs one store"""
+
+    params = ["header", "store"]
+    param_names = ["layout"]
+    timeout = 1200
+
+    def setup_cache(self):
+        fx = fixture()
+        use(fx)
+        out = os.path.join(tempfile.mkdtemp(), "SBW_store.hdf5")
+        return {"fx": fx, "store": hawk.consolidate(fx["dir"], out)}
+
+    def setup(self, cache, layout):
+        self.fname = cache["store"]
+        if layout == "header":
+            self.fname = os.path.join(cache["fx"]["dir"], "SBW_header.hdf5")
+        rng = np.random.default_rng(0)
+        sensors = SENSORS
+        self.reads = [
+            (f"LMS/BR_AR/{rep:02d}/{sensors[s]}/frf", i)
+            for rep, s, i in zip(
+                rng.integers(1, 6, 50),
+                rng.integers(0, len(sensors), 50),
+                rng.integers(0, 10, 50),
+            )
+        ]
+
+    def time_cold_open(self, cache, layout):
+        with h5py.File(self.fname, "r") as f:
+            f["LMS/BR_AR/01"].keys()
+
+    def time_random_read(self, cache, layout):
+        with h5py.File(self.fname, "r") as f:
+            for pth, i in self.reads:
+                f[pth][:, i]
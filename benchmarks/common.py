@@ -0,0 +1,30 @@
+import json
+import os
+import tempfile
+
+import hawk
+
+from . import hawk_synth
+
+# bump when the fixture layout changes so stale copies are rebuilt
+FIXTURE_VERSION = 1
+
+SENSORS = ["FRC", "EXH", "ULC-03", "LTC-05", "LLC-07", "UTE-01", "ULE-04", "LRT-02"]
+
+
+def fixture():
+    """Synthetic SBW + FST campaign, built once per machine in the temp dir"""
+    root = os.path.join(tempfile.gettempdir(), f"hawk_bench_{FIXTURE_VERSION}")
+    lut_file = os.path.join(root, "lut.json")
+    if not os.path.isfile(lut_file):
+        lut = hawk_synth.make_sbw(root, "BR_AR_*", n_freq=1601, n_time=8192)
+        lut |= hawk_synth.make_fst(root, "HS_WN_0*", n_time=8192)
+        with open(lut_file, "w") as f:
+            json.dump(lut, f)
+    with open(lut_file) as f:
+        return {"dir": root, "lut": json.load(f)}
+
+
+def use(fx):
+    """Make hawk accept the synthetic files (their md5s aren't in the real LUT)"""
+    hawk.lut.update(fx["lut"])
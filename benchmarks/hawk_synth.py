@@ -0,0 +1,227 @@
+import contextlib
+import fnmatch
+import hashlib
+import os
+import re
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import h5py
+import numpy as np
+
+from hawk_lut_fst import lut as lut_fst
+from hawk_lut_sbw import lut as lut_sbw
+from misc import all_sensors
+
+# figshare ids of the FST metadata csvs (see hawk.get_FST_metadata)
+FST_META_IDS = {
+    43971009: "Hawk_FST_sensor_meta.csv",
+    43971012: "Hawk_FST_test_meta.csv",
+}
+
+FST_SENSORS = ("SW_LC1", "SW_LC7", "SW_UC1", "SW_UC7", "PW_LC1", "PW_LC7")
+
+# %% Synthetic data
+
+
+def _md5(fname):
+    md5 = hashlib.md5()
+    with open(fname, "rb") as f:
+        for buf in iter(lambda: f.read(1 << 20), b""):
+            md5.update(buf)
+    return md5.hexdigest()
+
+
+def _keys(lut, patterns):
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    keys = {k for p in patterns for k in fnmatch.filter(lut, p)}
+    return sorted(k for k in keys if not k.endswith("_header"))
+
+
+def _split(key):
+    # 'DS_CTE_19' -> ('DS_CTE', '19')
+    series, test = key.rsplit("_", 1)
+    return series, test
+
+
+def _dataset(g, name, data, units, measurement=None, chunks=None):
+    d = g.create_dataset(name, data=data, chunks=chunks)
+    d.attrs["units"] = units
+    if measurement is not None:
+        d.attrs["measurement"] = measurement
+    return d
+
+
+def _frf(rng, n_freq, n_repeats):
+    # a few lightly damped modes plus noise so RFP has something to find
+    w = np.linspace(0, 160, n_freq)[:, None]
+    H = sum(1 / (wn**2 - w**2 + 2j * 0.02 * wn * w) for wn in rng.uniform(5, 155, 6))
+    noise = rng.standard_normal((n_freq, n_repeats)) * 1j
+    return H * (1 + 0.01 * rng.standard_normal((n_freq, n_repeats))) + 1e-5 * noise
+
+
+def make_sbw(
+    data_dir,
+    series="BR_AR_*",
+    sensors=None,
+    n_freq=1601,
+    n_time=16384,
+    n_repeats=10,
+    chunked_time=False,
+    seed=0,
+):
+    """Write a synthetic SBW campaign with the layout of the real data.
+
+    The header holds /LMS/xData/freq, /NI/xData/time and external links
+    /LMS/<series>/<test> and /NI/<series>/<test> into one <key>.hdf5 file per
+    test with <sensor>/frf and <sensor>/acc datasets and the usual attrs.
+    series selects keys of the real SBW LUT by glob. Returns a LUT (real ids,
+    synthetic md5s) for the header and every series written.
+    """
+    sensors = sorted(all_sensors) if sensors is None else list(sensors)
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    lut = {}
+    header = os.path.join(data_dir, "SBW_header.hdf5")
+    with h5py.File(header, "w") as h:
+        _dataset(h, "LMS/xData/freq", np.linspace(0, 160, n_freq), "Hz")
+        _dataset(h, "NI/xData/time", np.arange(n_time) / 2048, "s")
+        for key in _keys(lut_sbw, series):
+            s, t = _split(key)
+            fname = os.path.join(data_dir, key + ".hdf5")
+            with h5py.File(fname, "w") as f:
+                lms = f.create_group("LMS")
+                lms.attrs["addedMassg"] = str(int(rng.integers(0, 5)) * 50)
+                lms.attrs["excitationLevelV"] = str(float(rng.choice([0.4, 0.8])))
+                ni = f.create_group("NI")
+                ni.attrs["acquisitionSampleRate"] = "2048"
+                chunks = (min(4096, n_time), n_repeats) if chunked_time else None
+                for sensor in sensors:
+                    _dataset(
+                        lms, f"{sensor}/frf", _frf(rng, n_freq, n_repeats), "g/N", "FRF"
+                    )
+                    acc = rng.standard_normal((n_time, n_repeats))
+                    _dataset(ni, f"{sensor}/acc", acc, "g", "acceleration", chunks)
+            h[f"LMS/{s}/{t}"] = h5py.ExternalLink(key + ".hdf5", "/LMS")
+            h[f"NI/{s}/{t}"] = h5py.ExternalLink(key + ".hdf5", "/NI")
+            lut[key] = {"md5": _md5(fname), "id": lut_sbw[key]["id"]}
+    lut["SBW_header"] = {"md5": _md5(header), "id": lut_sbw["SBW_header"]["id"]}
+    return lut
+
+
+def make_fst(
+    data_dir,
+    series="HS_WN_0*",
+    sensors=FST_SENSORS,
+    signals=("acc",),
+    n_time=16384,
+    n_repeats=5,
+    seed=0,
+):
+    """Write a synthetic FST campaign and its metadata csvs.
+
+    The header links /<testID>/<NN> to the root of <testID>_<NN>.hdf5, which
+    holds <sensor>/<signal> datasets. series selects keys of the real FST LUT
+    by glob. Returns the LUT for the header and every series written.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    lut = {}
+    tests = []
+    header = os.path.join(data_dir, "FST_header.hdf5")
+    with h5py.File(header, "w") as h:
+        h.attrs["testCampaign"] = "FST"
+        for key in _keys(lut_fst, series):
+            s, t = _split(key)
+            fname = os.path.join(data_dir, key + ".hdf5")
+            with h5py.File(fname, "w") as f:
+                f.attrs["excitationLevelV"] = str(float(rng.choice([0.5, 1.0])))
+                for sensor in sensors:
+                    for signal in signals:
+                        data = rng.standard_normal((n_time, n_repeats))
+                        _dataset(f, f"{sensor}/{signal}", data, "g", signal)
+            h[f"{s}/{t}"] = h5py.ExternalLink(key + ".hdf5", "/")
+            lut[key] = {"md5": _md5(fname), "id": lut_fst[key]["id"]}
+            tests.append((s, int(t)))
+    lut["FST_header"] = {"md5": _md5(header), "id": lut_fst["FST_header"]["id"]}
+
+    with open(os.path.join(data_dir, FST_META_IDS[43971009]), "w") as f:
+        f.write("Hawk FST sensor metadata\n")
+        f.write("sensorID,signal,location\n")
+        for sensor in sensors:
+            for signal in signals:
+                f.write(f"{sensor},{signal},{sensor[:2]}\n")
+    with open(os.path.join(data_dir, FST_META_IDS[43971012]), "w") as f:
+        f.write("testID,testNumber,description\n")
+        for s, t in tests:
+            f.write(f"{s},{t},synthetic {s}\n")
+    return lut
+
+
+# %% Download stand-in
+
+
+def serve(data_dir, lut, host="127.0.0.1", port=0):
+    """Serve the files of a synthetic campaign the way figshare does.
+
+    GET <base_url><id> returns the file for that LUT id (or FST metadata csv),
+    honouring single 'bytes=start-' Range requests. The server runs on a
+    daemon thread; returns (server, base_url), call server.shutdown() to stop.
+    """
+    files = {str(v["id"]): k + ".hdf5" for k, v in lut.items()}
+    files |= {str(k): v for k, v in FST_META_IDS.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            name = files.get(self.path.rstrip("/").rsplit("/", 1)[-1])
+            fname = None if name is None else os.path.join(data_dir, name)
+            if fname is None or not os.path.isfile(fname):
+                self.send_error(404)
+                return
+            size = os.path.getsize(fname)
+            start = 0
+            m = re.fullmatch(r"bytes=(\d+)-", self.headers.get("Range", ""))
+            if m:
+                start = int(m.group(1))
+                if start >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(size - start))
+            self.end_headers()
+            with open(fname, "rb") as f:
+                f.seek(start)
+                shutil.copyfileobj(f, self.wfile)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/files/"
+
+
+@contextlib.contextmanager
+def stand_in(data_dir, lut):
+    """Point hawk's downloads at a local server for data_dir for the duration"""
+    import hawk
+
+    server, url = serve(data_dir, lut)
+    old = hawk.base_url, dict(hawk.lut)
+    hawk.base_url = url
+    hawk.lut.update(lut)
+    try:
+        yield url
+    finally:
+        hawk.base_url = old[0]
+        hawk.lut.clear()
+        hawk.lut.update(old[1])
+        server.shutdown()
+        server.server_close()
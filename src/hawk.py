@@ -1,18 +1,68 @@
+import base64
+import fnmatch
 import hashlib
+import io
+import json
 import os
-from urllib.request import urlretrieve
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen, urlretrieve
 import posixpath as pp
 import h5py
-import pandas as pd
 import numpy as np
-from hawk_lut_sbw import lut as lut_sbw
-from hawk_lut_fst import lut as lut_fst
+import hawk_disk
+import hawk_stats
+from hawk_stats import count, instrument, stats, timed
+from hawk_pool import FilePool
 
 # %% Misc declarations
 
 hdf5_group_getter = h5py.Group.__getitem__
 
-lut = lut_sbw | lut_fst
+_lut_lock = threading.Lock()
+
+
+def _lut():
+    """The merged SBW and FST LUT, loaded on first use (also as hawk.lut)"""
+    global lut
+    if "lut" not in globals():
+        with _lut_lock:
+            if "lut" not in globals():
+                from hawk_lut_sbw import lut as lut_sbw
+                from hawk_lut_fst import lut as lut_fst
+
+                lut = lut_sbw | lut_fst
+    return lut
+
+
+# asyncio API, imported on first use
+_async_names = {
+    "aget_data_if_missing",
+    "aopen_campaign",
+    "aopen_sbw",
+    "aopen_fst",
+    "aprefetch",
+}
+
+
+def __getattr__(name):
+    if name == "lut":
+        return _lut()
+    if name in _async_names:
+        import hawk_async
+
+        return getattr(hawk_async, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# where the LUT ids are served from, override to point at a mirror or a local server
+base_url = "https://figshare.com/ndownloader/files/"
+download_chunk = 1 << 20
 
 # %% Exceptions
 
@@ -24,137 +74,854 @@ class BadDownloadError(Exception):
 # %% Helper functions
 
 
+@timed("get_data_if_missing")
 def get_data_if_missing(key, data_dir):
     fname = os.path.join(data_dir, key + ".hdf5")
-    if not os.path.isfile(fname) or key not in lut:
-        url = f"https://figshare.com/ndownloader/files/{lut[key]['id']}"
-        print(
-            f"Downloading test data {key} from ORDA into {data_dir}", end="", flush=True
+    if key not in _lut():
+        return
+    if os.path.isfile(fname):
+        verify(key, data_dir)
+        return
+    print(f"Downloading test data {key} from ORDA into {data_dir}", end="", flush=True)
+    fetch(key, data_dir)
+    print(" [DONE] md5 verified")
+    return key
+
+
+@timed("md5")
+def file_md5(fname, md5=None):
+    """md5 of a file read in fixed size chunks, optionally continuing an existing hash"""
+    if md5 is None:
+        md5 = hashlib.md5()
+    with open(fname, "rb") as f:
+        for buf in iter(lambda: f.read(download_chunk), b""):
+            md5.update(buf)
+    return md5
+
+
+def read_stamp(fname):
+    try:
+        with open(fname + ".stamp") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_stamp(fname, md5):
+    st = os.stat(fname)
+    stamp = {"size": st.st_size, "mtime": st.st_mtime_ns, "md5": md5}
+    tmp = fname + ".stamp.tmp"
+    with open(tmp, "w") as f:
+        json.dump(stamp, f)
+    os.replace(tmp, fname + ".stamp")
+    return stamp
+
+
+def verify(key, data_dir):
+    """Check a downloaded file against the LUT md5.
+
+    The result is persisted as a stamp (size, mtime, md5) next to the file so
+    files that have already been verified are only stat'ed on later calls.
+    """
+    fname = os.path.join(data_dir, key + ".hdf5")
+    st = os.stat(fname)
+    stamp = read_stamp(fname)
+    if (
+        stamp is not None
+        and stamp["size"] == st.st_size
+        and stamp["mtime"] == st.st_mtime_ns
+        and stamp["md5"] == _lut()[key]["md5"]
+    ):
+        count("verify.stamp_hits")
+        return True
+    count("verify.stamp_misses")
+    md5 = file_md5(fname).hexdigest()
+    if not md5 == _lut()[key]["md5"]:
+        raise BadDownloadError(
+            f"md5 checksum missmatch for {fname}, delete the file and attempt to redownload"
+        )
+    write_stamp(fname, md5)
+    return True
+
+
+@timed("download")
+def fetch(key, data_dir, progress=None):
+    """Download a single LUT entry into data_dir, resuming from any partial .part file.
+
+    The md5 is computed as the bytes arrive and the file is only moved into
+    place (and stamped) once it matches the LUT. Downloads of the same file
+    by other threads or processes sharing data_dir wait on a lock file
+    (<key>.hdf5.lock, removed afterwards) and reuse the finished file.
+    """
+    fname = os.path.join(data_dir, key + ".hdf5")
+    os.makedirs(data_dir, exist_ok=True)
+    with hawk_disk.file_lock(fname + ".lock", remove=True):
+        if os.path.isfile(fname):
+            return fname  # fetched by someone else while we waited
+        return _fetch(key, fname, progress)
+
+
+def _fetch(key, fname, progress):
+    data_dir = os.path.dirname(fname)
+    part = fname + ".part"
+    start = os.path.getsize(part) if os.path.isfile(part) else 0
+    count("downloads")
+    req = Request(f"{base_url}{_lut()[key]['id']}")
+    if start:
+        req.add_header("Range", f"bytes={start}-")
+    try:
+        resp = urlopen(req)
+    except HTTPError as err:
+        # 416 means the range starts at the end of the file i.e. the .part is complete
+        if not (start and err.code == 416):
+            raise
+        resp = None
+    if resp is not None:
+        with resp:
+            if resp.status != 206:
+                start = 0  # server ignored the range request so start from scratch
+            nbytes = start + int(resp.headers.get("Content-Length") or 0)
+            hawk_disk.reserve(data_dir, key, nbytes)
+            try:
+                md5 = file_md5(part) if start else hashlib.md5()
+                with open(part, "ab" if start else "wb") as f:
+                    while True:
+                        buf = resp.read(download_chunk)
+                        if not buf:
+                            break
+                        f.write(buf)
+                        md5.update(buf)
+                        count("bytes_downloaded", len(buf))
+                        if progress is not None:
+                            progress(len(buf))
+            finally:
+                hawk_disk.release(data_dir, key)
+    else:
+        md5 = file_md5(part)
+    md5 = md5.hexdigest()
+    if not md5 == _lut()[key]["md5"]:
+        os.remove(part)
+        raise BadDownloadError(
+            "md5 checksum missmatch, check network connection and attempt to redownload"
+        )
+    os.replace(part, fname)
+    write_stamp(fname, md5)
+    # revalidate anything cached in memory against the new file
+    _indexes.clear()
+    _attrs_cache.clear()
+    return fname
+
+
+class Progress:
+    """Thread safe byte counter that prints progress and throughput of a bulk download"""
+
+    def __init__(self, n_files, interval=0.5, verbose=True):
+        self.n_files = n_files
+        self.done = 0
+        self.nbytes = 0
+        self.interval = interval
+        self.verbose = verbose
+        self.t0 = time.perf_counter()
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.nbytes / max(time.perf_counter() - self.t0, 1e-9)
+
+    def __call__(self, nbytes):
+        with self._lock:
+            self.nbytes += nbytes
+            now = time.perf_counter()
+            if now - self._last > self.interval:
+                self._last = now
+                self.report()
+
+    def finish(self, key):
+        with self._lock:
+            self.done += 1
+            self.report(key)
+
+    def report(self, key=None):
+        if not self.verbose:
+            return
+        msg = (
+            f"\r[{self.done}/{self.n_files}] {self.nbytes / 1e6:.1f} MB "
+            f"({self.rate / 1e6:.1f} MB/s)"
         )
-        fn, _ = urlretrieve(url, fname)
-        print(" [DONE] checking md5 hash", end="", flush=True)
-        with open(fn, "rb") as f:
-            md5 = hashlib.md5(f.read()).hexdigest()
-            if not md5 == lut[key]["md5"]:
-                raise BadDownloadError(
-                    "md5 checksum missmatch, check network connection and attempt to redownload"
-                )
+        if key is not None:
+            msg += f" {key} [DONE]"
+        print(msg, end="", flush=True)
+
+
+def resolve_keys(keys):
+    """Expand a key, glob or list of either into the matching LUT keys"""
+    if isinstance(keys, str):
+        keys = [keys]
+    out = []
+    for k in keys:
+        matches = fnmatch.filter(_lut(), k)
+        if not matches:
+            raise KeyError(f"{k} does not match any test series in the LUT")
+        out.extend(m for m in sorted(matches) if m not in out)
+    return out
+
+
+def prefetch(keys, data_dir="./hawk_data", workers=4, verbose=True):
+    """Download all of the test series matching keys (e.g. 'DS_*') concurrently.
+
+    Partial downloads are kept as .part files and resumed on the next call.
+    Returns the list of keys that were downloaded.
+    """
+    if not os.path.isdir(data_dir):
+        os.makedirs(data_dir)
+    todo = [
+        k
+        for k in resolve_keys(keys)
+        if not os.path.isfile(os.path.join(data_dir, k + ".hdf5"))
+    ]
+    progress = Progress(len(todo), verbose=verbose)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futs = {pool.submit(fetch, k, data_dir, progress): k for k in todo}
+        for fut in as_completed(futs):
+            fut.result()
+            progress.finish(futs[fut])
+    if verbose and todo:
+        print()
+    return todo
+
+
+def resolve(obj, path, download=True):
+    """The (filename, internal path) that path relative to obj lives at.
+
+    External links into the per-series files are followed without opening
+    them, downloading the series file if it is missing (unless download is
+    False). Uses the path index when one has been built for the file.
+    """
+    f = obj.file
+    full = pp.normpath(pp.join(obj.name, path)).strip("/")
+    idx = _indexes.get(f.filename)
+    if idx is not None:
+        e = idx["flat"].get(full)
+        if e is not None and e["kind"] != "external":
+            fname = os.path.join(os.path.dirname(f.filename), e["file"])
+            if os.path.isfile(fname):  # else evicted since, e.g. by another process
+                return fname, e["name"]
+    parts = full.split("/")
+    for i in range(1, len(parts) + 1):
+        link = f.get("/" + "/".join(parts[:i]), getlink=True)
+        if isinstance(link, h5py.ExternalLink):
+            fname = os.path.join(os.path.dirname(f.filename), link.filename)
+            if download and not os.path.isfile(fname):
+                key = os.path.splitext(os.path.basename(fname))[0]
+                get_data_if_missing(key, os.path.dirname(fname))
+            return fname, pp.join(link.path, *parts[i:])
+    return f.filename, "/" + "/".join(parts)
+
+
+# %% Path index
+
+# in memory indexes keyed by header filename
+_indexes = {}
+
+
+def _stat(fname):
+    try:
+        st = os.stat(fname)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _entry(obj, fname):
+    e = {"file": os.path.basename(fname), "name": obj.name, "attrs": dict(obj.attrs)}
+    if isinstance(obj, h5py.Dataset):
+        e |= {"kind": "dataset", "shape": obj.shape, "dtype": obj.dtype.str}
+    else:
+        e["kind"] = "group"
+    return e
+
+
+def _encode(v):
+    # JSON form of an attribute value; arrays and bytes are tagged dicts
+    if isinstance(v, (np.ndarray, np.generic)):
+        a = np.asarray(v)
+        out = {"shape": a.shape, "scalar": isinstance(v, np.generic)}
+        if a.dtype.hasobject:
+            return out | {"object": [_encode(x) for x in a.ravel().tolist()]}
+        if a.dtype.fields is not None:
+            raise TypeError(f"can't store a {a.dtype} attribute in the index")
+        data = base64.b64encode(np.ascontiguousarray(a).tobytes()).decode()
+        return out | {"dtype": a.dtype.str, "data": data}
+    if isinstance(v, bytes):
+        return {"bytes": base64.b64encode(v).decode()}
+    return v
+
+
+def _decode(v):
+    if not isinstance(v, dict):
+        return v
+    if "bytes" in v:
+        return base64.b64decode(v["bytes"])
+    if "object" in v:
+        a = np.empty(len(v["object"]), dtype=object)
+        a[:] = [_decode(x) for x in v["object"]]
+    else:
+        a = np.frombuffer(base64.b64decode(v["data"]), dtype=v["dtype"]).copy()
+    a = a.reshape(v["shape"])
+    return a[()] if v["scalar"] else a
+
+
+def _dump_index(idx, fname):
+    def entries(es):
+        return {
+            k: (
+                e | {"attrs": {a: _encode(x) for a, x in e["attrs"].items()}}
+                if "attrs" in e
+                else e
+            )
+            for k, e in es.items()
+        }
+
+    out = {
+        "header": idx["header"],
+        "entries": entries(idx["entries"]),
+        "links": idx["links"],
+        "series": {
+            k: {"stat": v["stat"], "entries": entries(v["entries"])}
+            for k, v in idx["series"].items()
+        },
+    }
+    tmp = f"{fname}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(out, fh)
+    os.replace(tmp, fname)
+
+
+def _load_index(fname):
+    def stat(st):
+        return None if st is None else tuple(st)
+
+    def entries(es):
+        for e in es.values():
+            if "attrs" in e:
+                e["attrs"] = {a: _decode(x) for a, x in e["attrs"].items()}
+            if "shape" in e:
+                e["shape"] = tuple(e["shape"])
+        return es
+
+    with open(fname) as fh:
+        idx = json.load(fh)
+    idx["header"] = stat(idx["header"])
+    idx["entries"] = entries(idx["entries"])
+    idx["links"] = {k: tuple(v) for k, v in idx["links"].items()}
+    for v in idx["series"].values():
+        v["stat"] = stat(v["stat"])
+        v["entries"] = entries(v["entries"])
+    return idx
+
+
+def _index_header(f):
+    entries, links = {}, {}
+
+    def walk(g, prefix):
+        for k in g.keys():
+            pth = pp.join(prefix, k)
+            link = g.get(k, getlink=True)
+            if isinstance(link, h5py.ExternalLink):
+                links[pth] = (link.filename, link.path)
             else:
-                print(" [DONE]")
-                return key
+                o = hdf5_group_getter(g, k)
+                entries[pth] = _entry(o, f.filename)
+                if isinstance(o, h5py.Group):
+                    walk(o, pth)
+
+    walk(f, "")
+    return entries, links
+
+
+def _index_series(fname, target, prefix):
+    entries = {}
+    with h5py.File(fname, "r") as f:
+        g = hdf5_group_getter(f, target)
+        entries[prefix] = _entry(g, fname)
+
+        def add(name, o):
+            entries[pp.join(prefix, name)] = _entry(o, fname)
+
+        g.visititems(add)
+    return entries
+
+
+def index(obj, refresh=False, persist=True):
+    """Catalogue of everything reachable from the header file that obj belongs to.
+
+    Maps header relative paths (as used with data[...]) to a dict with the
+    series file, internal object name, kind, shape, dtype and attrs. Series
+    that are not downloaded yet appear as a single entry of kind 'external'.
+    The index is kept in memory and, with persist, saved as JSON next to the
+    header so it only needs rebuilding for series files that changed since.
+    """
+    f = obj.file
+    hname = f.filename
+    idx = _indexes.get(hname)
+    if idx is not None and not refresh:
+        count("index.hits")
+        return idx["flat"]
+    count("index.misses")
+    cache = hname + ".index.json"
+    if idx is None and persist and os.path.isfile(cache):
+        try:
+            idx = _load_index(cache)
+        except (OSError, ValueError, KeyError, TypeError):
+            idx = None  # unreadable, rebuild it
+    changed = False
+    if idx is None or idx["header"] != _stat(hname):
+        entries, links = _index_header(f)
+        idx = {"header": _stat(hname), "entries": entries, "links": links, "series": {}}
+        changed = True
+    data_dir = os.path.dirname(hname)
+    for pth, (target_file, target) in idx["links"].items():
+        fname = os.path.join(data_dir, target_file)
+        st = _stat(fname)
+        cached = idx["series"].get(pth)
+        if cached is not None and cached["stat"] == st:
+            continue
+        if st is None:
+            entries = {pth: {"kind": "external", "file": target_file, "name": target}}
+        else:
+            entries = _index_series(fname, target, pth)
+        idx["series"][pth] = {"stat": st, "entries": entries}
+        changed = True
+    if changed or "flat" not in idx:
+        idx.pop("order", None)
+        flat = dict(idx["entries"])
+        for series in idx["series"].values():
+            flat.update(series["entries"])
+        idx["flat"] = flat
+    if changed and persist:
+        try:
+            _dump_index(idx, cache)
+        except TypeError:
+            pass  # attributes JSON can't hold, keep the index in memory only
+    _indexes[hname] = idx
+    return idx["flat"]
+
+
+def catalogue(obj, pattern="*", kind=None):
+    """Index entries whose path matches the glob pattern, optionally of one kind"""
+    return {
+        k: v
+        for k, v in index(obj).items()
+        if fnmatch.fnmatchcase(k, pattern) and (kind is None or v["kind"] == kind)
+    }
 
 
 # %% Wrappers
 
 
-def Group_getter_wrapped(self, *args, **kwargs):
-    try:
-        pth = pp.join(self.path, pp.normpath(args[0]))
-    except AttributeError:
-        pth = pp.normpath(args[0])
-        self.data_dir = ""
+@lru_cache(maxsize=1 << 16)
+def path_key(base, name):
+    """Header relative path and LUT key for looking up name from a group at base"""
+    if isinstance(name, bytes):
+        name = name.decode()
+    pth = pp.join(base, pp.normpath(name))
     if pth.startswith("/"):
         pth = pth[1:]
-
-    # print(pth)
-
     key = "_".join(pth.split("/")[:3])
-
     if key.startswith("LMS") or key.startswith("NI"):
         key = "_".join(key.split("_")[1:])
+    return pth, key
 
-    # print(pth, key)
 
-    try:
-        item = hdf5_group_getter(self, *args, **kwargs)
-    except KeyError as err:
-        if not get_data_if_missing(key, self.data_dir):
-            raise err
-        else:
-            item = hdf5_group_getter(self, *args, **kwargs)
-    item.path = pth
-    item.data_dir = self.data_dir
-    return item
+@timed("lookup")
+def lookup(group, name):
+    """The object at name relative to a HawkGroup, downloading missing series on the way"""
+    h5 = group.h5
+    if not isinstance(name, (str, bytes)):  # object references
+        return hdf5_group_getter(h5, name)
+    pth, key = path_key(group.path, name)
+    pool = group.pool
+    target = None if pool is None else pool.target(pth)
+    if target is not None:
+        # under an external link: look up in the pooled series file directly
+        fname, internal = target
+        try:
+            f = pool.get(fname)
+        except FileNotFoundError:
+            series = os.path.splitext(os.path.basename(fname))[0]
+            if not get_data_if_missing(series, os.path.dirname(fname)):
+                raise KeyError(f"Unable to open object (series file {fname} missing)")
+            f = pool.get(fname)
+        hawk_disk.touch(fname)
+        item = hdf5_group_getter(f, internal)
+    else:
+        try:
+            item = hdf5_group_getter(h5, name)
+        except KeyError as err:
+            if not get_data_if_missing(key, group.data_dir):
+                raise err
+            else:
+                item = hdf5_group_getter(h5, name)
+        if item.id.fileno != h5.id.fileno:
+            count("external_opens")  # the lookup crossed an external link
+            hawk_disk.touch(item.file.filename)
+    return wrap(item, pth, group.data_dir, pool)
+
+
+def wrap(obj, path="", data_dir="", pool=None):
+    """Wrap an h5py group or dataset in the matching Hawk class"""
+    if isinstance(obj, h5py.Dataset):
+        return HawkDataset(obj, path, data_dir, pool)
+    if isinstance(obj, h5py.File):
+        return HawkFile(obj, path, data_dir, pool)
+    if isinstance(obj, h5py.Group):
+        return HawkGroup(obj, path, data_dir, pool)
+    return obj
+
+
+def _h5(obj):
+    # the h5py object behind obj
+    return obj.h5 if isinstance(obj, HawkObject) else obj
+
+
+class HawkObject:
+    """An h5py object (.h5) together with its path relative to the campaign header.
+
+    Attributes not defined here are looked up on the h5py object, so the
+    usual h5py API (attrs, name, shape, dtype, ...) is available as is.
+    """
+
+    __slots__ = ("h5", "path", "data_dir", "pool")
+
+    def __init__(self, h5, path="", data_dir="", pool=None):
+        self.h5 = h5
+        self.path = path
+        self.data_dir = data_dir
+        self.pool = pool
+
+    def __getattr__(self, name):
+        if name in HawkObject.__slots__:  # not set yet
+            raise AttributeError(name)
+        return getattr(self.h5, name)
+
+    def __dir__(self):
+        return sorted(set(object.__dir__(self)) | set(dir(self.h5)))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.path or '/'!r} {self.h5!r}>"
+
+    def __eq__(self, other):
+        return self.h5 == _h5(other)
+
+    def __hash__(self):
+        return hash(self.h5)
+
+    def __bool__(self):
+        return bool(self.h5)
+
+    def setup(self, out=None):
+        return setup(self, out)
+
+    def explore(self, depth=10, out=None):
+        return explore2(self, depth, out)
+
+    def describe(self, setup=1):
+        return describe(self, setup)
+
+
+class HawkGroup(HawkObject):
+    """Group whose lookups take header relative paths and download missing series"""
+
+    __slots__ = ()
+
+    def __getitem__(self, name):
+        return lookup(self, name)
+
+    def get(self, name, default=None, getclass=False, getlink=False):
+        if getclass or getlink:
+            return self.h5.get(name, default, getclass, getlink)
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return name in self.h5
+
+    def __iter__(self):
+        return iter(self.h5)
+
+    def __len__(self):
+        return len(self.h5)
+
+    def keys(self):
+        return self.h5.keys()
+
+    def values(self):
+        return [self[k] for k in self.h5]
+
+    def items(self):
+        return [(k, self[k]) for k in self.h5]
+
+    async def aget(self, name):
+        import hawk_async
+
+        return await hawk_async.aget(self, name)
+
+
+class HawkFile(HawkGroup):
+    """Campaign header (or store) opened by SBW()/FST()"""
+
+    __slots__ = ()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.clear()
+        self.h5.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HawkDataset(HawkObject):
+    """Dataset whose reads are counted by hawk_stats while it is enabled"""
+
+    __slots__ = ()
+
+    def __getitem__(self, sel):
+        out = self.h5[sel]
+        if hawk_stats.on:
+            hawk_stats.add_bytes(self.h5, getattr(out, "nbytes", 0))
+        return out
+
+    def read_direct(self, dest, source_sel=None, dest_sel=None):
+        self.h5.read_direct(dest, source_sel, dest_sel)
+        if hawk_stats.on:
+            filled = dest if dest_sel is None else dest[dest_sel]
+            hawk_stats.add_bytes(self.h5, filled.nbytes)
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[()]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(self.h5)
+
+    def __iter__(self):
+        return iter(self.h5)
+
+    def memmap(self):
+        return memmap(self)
+
+    def read(self, sel=(), as_memmap=False):
+        return read(self, sel, as_memmap)
+
+    def read_many(self, sels):
+        import hawk_plan
+
+        return hawk_plan.read_many(self, sels)
+
+    def overview(self, t0=None, t1=None, max_points=2000, axis=None):
+        import hawk_pyramid
+
+        return hawk_pyramid.overview(self, t0, t1, max_points, axis)
+
+    async def aread(self, sel=(), as_memmap=False):
+        import hawk_async
+
+        return await hawk_async.aread(self, sel, as_memmap)
 
 
 # %% API
 
 
-def SBW(data_dir="./hawk_data"):
+def open_campaign(
+    campaign,
+    data_dir="./hawk_data",
+    pool_size=None,
+    rdcc_nbytes=None,
+    rdcc_nslots=None,
+    rdcc_w0=None,
+):
+    """Open the header of a campaign, or its consolidated store if there is one.
+
+    Returns a HawkFile; lookups through it and the HawkGroups it returns take
+    paths relative to the header and download missing series on access.
+    Series files reached from it are held open in an LRU pool (obj.pool, see
+    hawk_pool.FilePool) of pool_size files (default hawk_pool.pool_size, 0
+    lets HDF5 open them through the external links as before), each with the
+    given chunk cache settings. obj.pool.stats() reports the pool hit rate.
+    """
     if not os.path.isdir(data_dir):
         os.makedirs(data_dir)
-    pth = os.path.join(data_dir, "SBW_header.hdf5")
-    get_data_if_missing("SBW_header", data_dir)
-    obj = h5py.File(pth, "r")
-    obj.data_dir = data_dir
-    obj.path = ""
-    return obj
+    pth = os.path.join(data_dir, f"{campaign}_store.hdf5")
+    if not os.path.isfile(pth):
+        pth = os.path.join(data_dir, f"{campaign}_header.hdf5")
+        get_data_if_missing(f"{campaign}_header", data_dir)
+    pool = None
+    if pool_size != 0:
+        pool = FilePool(pth, pool_size, rdcc_nbytes, rdcc_nslots, rdcc_w0)
+    return HawkFile(h5py.File(pth, "r"), "", data_dir, pool)
 
 
-def FST(data_dir="./hawk_data"):
-    if not os.path.isdir(data_dir):
-        os.makedirs(data_dir)
-    pth = os.path.join(data_dir, "FST_header.hdf5")
-    get_data_if_missing("FST_header", data_dir)
-    obj = h5py.File(pth, "r")
-    obj.data_dir = data_dir
-    obj.path = ""
-    return obj
+def SBW(data_dir="./hawk_data", **pool):
+    return open_campaign("SBW", data_dir, **pool)
+
+
+def FST(data_dir="./hawk_data", **pool):
+    return open_campaign("FST", data_dir, **pool)
+
+
+# memoised inherited attrs keyed by (filename, object name)
+attrs_cache_size = 4096
+_attrs_cache = OrderedDict()
+
+
+def inherited_attrs(f, name):
+    """attrs of the object at name in f merged with those of all its ancestors.
+
+    As with setup, attrs set higher up the tree take precedence. Results are
+    held in an LRU cache so warm lookups don't touch the HDF5 attribute API.
+    The returned dict is shared with the cache and must not be modified.
+    """
+    key = (f.filename, name)
+    try:
+        out = _attrs_cache[key]
+        _attrs_cache.move_to_end(key)
+        count("attrs_cache.hits")
+        return out
+    except KeyError:
+        count("attrs_cache.misses")
+    out = dict(hdf5_group_getter(f, name).attrs)
+    if not name == "/":
+        out |= inherited_attrs(f, pp.dirname(name))
+    _attrs_cache[key] = out
+    while len(_attrs_cache) > attrs_cache_size:
+        _attrs_cache.popitem(last=False)
+    return out
 
 
+@timed("setup")
 def setup(obj, out=None):
     if out is None:
         out = {}
-    out |= obj.attrs
-    if not obj.name == "/":
-        pf = obj.file
-        # these objects are not persistent and so no need to track these
-        pf.data_dir = ""
-        pf.path = ""
-        parent = pf.get(pp.dirname(obj.name))
-        out |= setup(parent, out)
+    out |= inherited_attrs(obj.file, obj.name)
     return out
 
 
-def explore2(obj, depth=10, out=None):
-    opath = obj.path
-    if obj.path == "":
-        opath = "/"
-    if out is None:
-        out = {}
-    new = {}
+def setup_tree(obj):
+    """Effective (setup) metadata for obj and everything below it in one pass"""
+    f = obj.file
+    base = getattr(obj, "path", obj.name)
+    out = {base: dict(inherited_attrs(f, obj.name))}
+    if isinstance(_h5(obj), h5py.Group):
+        names = []
+        obj.visit(names.append)
+        for name in names:
+            out[pp.join(base, name)] = dict(inherited_attrs(f, pp.join(obj.name, name)))
+    return out
+
+
+def _describe_dataset(pth, attrs, shape):
+    meas = attrs["measurement"] if "measurement" in attrs else pth.split("/")[-1]
+    return f"Dataset: {meas} ({attrs.get('units')}) {shape}"
+
+
+def _walk_index(idx, base, depth):
+    flat = idx["flat"]
+    if "order" not in idx:
+        idx["order"] = sorted(flat, key=lambda k: k.split("/"))
+    prefix = base + "/" if base else ""
+    for pth in idx["order"]:
+        if not pth.startswith(prefix) or pth == base:
+            continue
+        level = pth.count("/") - prefix.count("/") + 1
+        if level > depth:
+            continue
+        e = flat[pth]
+        if e["kind"] == "external":
+            yield pth, "external", "(undownloaded)"
+        elif e["kind"] == "dataset":
+            yield pth, "dataset", _describe_dataset(pth, e["attrs"], e["shape"])
+        elif level < depth:
+            yield pth, "group", "Group"
+        else:
+            yield pth, "...", "..."
+
+
+def _walk_file(obj, base, depth, follow_links):
     for k in obj.keys():
-        pth = pp.join(opath, k)
+        pth = pp.join(base, k)
         link = obj.get(k, getlink=True)
         if isinstance(link, h5py.ExternalLink):
-            new |= {pth: "(undownloaded)"}
+            fname = os.path.join(os.path.dirname(obj.file.filename), link.filename)
+            if not os.path.isfile(fname):
+                yield pth, "external", "(undownloaded)"
+                continue
+            if not follow_links:
+                yield pth, "external", "(downloaded)"
+                continue
+        o = hdf5_group_getter(obj, k)
+        if isinstance(o, h5py.Dataset):
+            yield pth, "dataset", _describe_dataset(pth, o.attrs, o.shape)
+        elif depth > 1:
+            yield pth, "group", "Group"
+            yield from _walk_file(o, pth, depth - 1, follow_links)
         else:
-            o = obj.get(k)
-            if isinstance(o, h5py.Dataset):
-                if 'measurement' not in o.attrs.keys():
-                    meas = pth.split('/')[-1]
-                else:
-                    meas = o.attrs['measurement']
-                new |= {
-                    pth: f"Dataset: {meas} ({o.attrs['units']}) {o.shape}"
-                }
-            elif depth > 1:
-                new |= explore2(o, depth=depth - 1)
-            else:
-                new |= {pth: "..."}
-    out |= {opath: new}
+            yield pth, "...", "..."
+
+
+def iter_tree(obj, depth=10, pattern=None, limit=None, page=0, follow_links=True):
+    """Lazily yield (path, kind, description) for everything below obj.
+
+    kind is one of 'group', 'dataset', 'external' (a link into a series file
+    that is not followed) or '...' (a group at the depth limit). Undownloaded
+    series are never opened. Entries come from the path index if one has been
+    built for the file, otherwise from a walk of the file. pattern is a glob
+    on the path and limit/page select one page of the (filtered) entries.
+    """
+    base = getattr(obj, "path", obj.name.strip("/"))
+    idx = _indexes.get(obj.file.filename)
+    if idx is not None:
+        entries = _walk_index(idx, base, depth)
+    else:
+        entries = _walk_file(_h5(obj), base, depth, follow_links)
+    if pattern is not None:
+        entries = (e for e in entries if fnmatch.fnmatchcase(e[0], pattern))
+    if limit is not None:
+        entries = islice(entries, page * limit, (page + 1) * limit)
+    return entries
+
+
+@timed("explore")
+def explore2(obj, depth=10, out=None):
+    opath = getattr(obj, "path", obj.name.strip("/")) or "/"
+    if out is None:
+        out = {}
+    root = out.setdefault(opath, {})
+    groups = {}
+    for pth, kind, desc in iter_tree(obj, depth):
+        parent = groups.get(pp.dirname(pth), root)
+        if kind == "group":
+            parent[pth] = groups[pth] = {}
+        else:
+            parent[pth] = desc
     return out
 
 
 def visit_linked(obj, func):
     func(obj.name, obj)
-    if not isinstance(obj, h5py.Dataset):
+    if not isinstance(_h5(obj), h5py.Dataset):
         for item in obj.values():
             visit_linked(item, func)
 
 
 def describe(obj, setup=1):
-    if isinstance(obj, h5py.File):
+    if isinstance(_h5(obj), h5py.File):
         return "Header file for Hawk dataset.  See documentation for details."
     else:
         s = [
@@ -170,52 +937,236 @@ def describe(obj, setup=1):
         return out
 
 
+# %% Dataset access
+
+
+def memmap(dset):
+    """Read-only np.memmap over the raw bytes of a dataset, or None if it can't be mapped.
+
+    Only contiguous, unfiltered datasets in a plain (sec2) file can be mapped.
+    Processes mapping the same dataset share one page cached copy of it.
+    """
+    if dset.file.driver != "sec2" or dset.external or dset.shape is None:
+        return None
+    if dset.id.get_create_plist().get_layout() != h5py.h5d.CONTIGUOUS:
+        return None
+    offset = dset.id.get_offset()
+    if offset is None:  # storage not allocated yet
+        return None
+    dtype = dset.id.get_type().dtype  # on disk layout, including byte order
+    if dtype.hasobject:
+        return None
+    return np.memmap(
+        dset.file.filename, mode="r", dtype=dtype, shape=dset.shape, offset=offset
+    )
+
+
+def read(dset, sel=(), as_memmap=False):
+    """Read sel from dset, as a view on a np.memmap where possible if as_memmap"""
+    if as_memmap:
+        m = memmap(dset)
+        if m is not None:
+            return m[sel]
+    return dset[sel]
+
+
 # %% Advanced slicing for the Hawk FST
 
 
+# parsed metadata tables keyed by csv filename
+_tables = {}
+
+
+def read_table(fname, **kwargs):
+    """pd.read_csv cached in memory and as JSON next to the csv.
+
+    Both caches are keyed by the size and mtime of the csv so they are
+    invalidated when it changes. Where the JSON can't be written the table
+    is only cached in memory. Returns a copy that is safe to modify.
+    """
+    import pandas as pd
+
+    stamp = _stat(fname)
+    hit = _tables.get(fname)
+    count("tables.hits" if hit is not None and hit[0] == stamp else "tables.misses")
+    if hit is None or hit[0] != stamp:
+        cache = fname + ".json"
+        hit = None
+        if os.path.isfile(cache):
+            try:
+                with open(cache) as fh:
+                    saved = json.load(fh)
+                table = pd.read_json(io.StringIO(saved["table"]), orient="table")
+                hit = (tuple(saved["stamp"]), table)
+            except (OSError, ValueError, KeyError, TypeError):
+                hit = None
+        if hit is None or hit[0] != stamp:
+            hit = (stamp, pd.read_csv(fname, **kwargs))
+            saved = {
+                "stamp": stamp,
+                "table": hit[1].to_json(orient="table", index=False),
+            }
+            tmp = f"{cache}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w") as fh:
+                    json.dump(saved, fh)
+                os.replace(tmp, cache)
+            except OSError:
+                pass  # read-only metadata directory, keep the table in memory only
+        _tables[fname] = hit
+    return hit[1].copy()
+
+
 def get_FST_metadata(data_dir="./"):
     """Load the FST metadata as two pandas dfs. One for the tests and another for the sensors"""
     sensor_fname = os.path.join(data_dir, "Hawk_FST_sensor_meta.csv")
     if not os.path.isfile(sensor_fname):
-        sensor_url = "https://figshare.com/ndownloader/files/43971009"
-        urlretrieve(sensor_url, sensor_fname)
-    sensor_data = pd.read_csv(os.path.join(data_dir, sensor_fname), skiprows=1)
+        urlretrieve(f"{base_url}43971009", sensor_fname)
+    sensor_data = read_table(sensor_fname, skiprows=1)
 
     test_fname = os.path.join(data_dir, "Hawk_FST_test_meta.csv")
     if not os.path.isfile(test_fname):
-        test_url = "https://figshare.com/ndownloader/files/43971012"
-        urlretrieve(test_url, test_fname)
-    test_data = pd.read_csv(os.path.join(data_dir, test_fname))
+        urlretrieve(f"{base_url}43971012", test_fname)
+    test_data = read_table(test_fname)
 
     return test_data, sensor_data
 
-def slice_from_dfs(data, tests=[], channels=[]):
-    out = []
-    paths = tests["testID"] + "/" + tests["testNumber"].astype(str).str.zfill(2)
-    for test in paths:
-        test_out = []
-        for signal, sensor in zip(channels["signal"], channels["sensorID"]):
-            reps = data[test][sensor][signal][:]
-            test_out.append(reps.T)
-        out.append(test_out)
-    try:
-        arr = np.array(out).transpose(3, 2, 0, 1)
-    except ValueError as e:
-        print(e)
-        print("Ragged arrays detected, returning nested lists")
-        arr = out
-    return arr
 
-# %% Horrible monkey patches
+def _match(values, patterns):
+    # mask of values matching any of the glob patterns
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    uniq = values.astype(str).unique()
+    hits = {v for p in patterns for v in fnmatch.filter(uniq, str(p))}
+    return values.astype(str).isin(hits)
+
+
+def select(data, tests=None, sensors=None, signal=None, meta_dir=None):
+    """Select FST datasets by test, sensor and signal using the metadata tables.
+
+    tests are testID globs (e.g. 'HS_*') or 'testID/NN' paths, sensors are
+    sensorID globs and signal one or more signal names. Returns one row per
+    (test, channel) with the test and sensor metadata, the dataset path and,
+    for downloaded series, its shape and dtype from the path index. No
+    external files are opened once the index has been built.
+    """
+    test_data, sensor_data = get_FST_metadata(meta_dir or data.data_dir)
+    test_paths = (
+        test_data["testID"] + "/" + test_data["testNumber"].astype(str).str.zfill(2)
+    )
+    if tests is not None:
+        test_data = test_data[
+            _match(test_data["testID"], tests) | _match(test_paths, tests)
+        ]
+    if sensors is not None:
+        sensor_data = sensor_data[_match(sensor_data["sensorID"], sensors)]
+    if signal is not None:
+        sensor_data = sensor_data[_match(sensor_data["signal"], signal)]
+    out = test_data.merge(sensor_data, how="cross", suffixes=("", "_sensor"))
+    out["path"] = (
+        out["testID"]
+        + "/"
+        + out["testNumber"].astype(str).str.zfill(2)
+        + "/"
+        + out["sensorID"]
+        + "/"
+        + out["signal"]
+    )
+    idx = index(data)
+    entries = [idx.get(p, {}) for p in out["path"]]
+    out["shape"] = [e.get("shape") for e in entries]
+    out["dtype"] = [e.get("dtype") for e in entries]
+    return out
+
+
+def stack_rows(n, rows=None):
+    """Source selection of the rows (a slice of the first axis) of a dataset of length n"""
+    return slice(0, n) if rows is None else slice(*rows.indices(n))
+
+
+def stack_layout(dsets, fill_value=np.nan, rows=None):
+    """Shape, dtype and per-dataset (time, repeats) lengths of a stacked grid of datasets"""
+    lengths = np.ones((len(dsets), len(dsets[0]), 2), dtype=int)
+    for i, row in enumerate(dsets):
+        for j, d in enumerate(row):
+            lengths[i, j, : d.ndim] = d.shape
+            if rows is not None:
+                lengths[i, j, 0] = len(range(d.shape[0])[rows])
+    nt, nr = lengths.max((0, 1))
+    ragged = bool((lengths != (nt, nr)).any())
+    dtype = np.result_type(*[d.dtype for row in dsets for d in row])
+    if ragged:
+        dtype = np.result_type(dtype, fill_value)
+    return (nt, nr, *lengths.shape[:2]), dtype, lengths, ragged
+
+
+def stack_sel(ndim, length, i, j):
+    """Destination selection of dataset (i, j) in the stacked output"""
+    t, r = length
+    return np.s_[:t, :r, i, j] if ndim > 1 else np.s_[:t, 0, i, j]
+
 
-h5py.Group.__getitem__ = Group_getter_wrapped
+@timed("stack")
+def stack(data, paths, fill_value=np.nan, workers=None, rows=None):
+    """Read a (tests x channels) grid of dataset paths into one preallocated array.
+
+    Every (time, repeats) dataset is read straight into its slot of the
+    (time, repeats, tests, channels) output with read_direct. Ragged datasets
+    are padded with fill_value and the (time, repeats) lengths of each dataset
+    are returned alongside as a (tests, channels, 2) array. rows (a slice, e.g.
+    from hawk_plan.axis_rows) restricts the read to part of the time or
+    frequency axis, so only the chunks it covers are read. With workers > 1
+    the reads are spread over a process pool (see hawk_parallel.gather).
+    """
+    if workers is not None and workers > 1:
+        import hawk_parallel
+
+        return hawk_parallel.gather(data, paths, fill_value, workers, rows)
+    dsets = [[data[p] for p in row] for row in paths]
+    shape, dtype, lengths, ragged = stack_layout(dsets, fill_value, rows)
+    out = np.empty(shape, dtype=dtype)
+    if ragged:
+        out.fill(fill_value)
+    for i, row in enumerate(dsets):
+        for j, d in enumerate(row):
+            sel = stack_sel(d.ndim, lengths[i, j], i, j)
+            src = stack_rows(d.shape[0], rows)
+            if d.dtype == dtype:
+                d.read_direct(out, source_sel=src, dest_sel=sel)
+            else:
+                out[sel] = d[src]  # HDF5 can't convert e.g. float -> complex in place
+    return out, lengths
+
+
+@timed("slice_from_dfs")
+def slice_from_dfs(
+    data,
+    tests=[],
+    channels=[],
+    fill_value=np.nan,
+    return_lengths=False,
+    workers=None,
+    rows=None,
+):
+    paths = tests["testID"] + "/" + tests["testNumber"].astype(str).str.zfill(2)
+    chans = list(zip(channels["signal"], channels["sensorID"]))
+    grid = [[f"{test}/{sensor}/{signal}" for signal, sensor in chans] for test in paths]
+    arr, lengths = stack(data, grid, fill_value=fill_value, workers=workers, rows=rows)
+    if return_lengths:
+        return arr, lengths
+    if (lengths != lengths[0, 0]).any():
+        print(f"Ragged arrays detected, padding with {fill_value}")
+    return arr
 
-h5py.Group.setup = setup
-h5py.Dataset.setup = setup
 
-h5py.Group.explore = explore2
-h5py.Dataset.explore = explore2
+# %% Tools
 
-h5py.File.describe = describe
-h5py.Group.describe = describe
-h5py.Dataset.describe = describe
+from hawk_cache import cache  # noqa: E402
+from hawk_store import consolidate  # noqa: E402
+from hawk_pyramid import build_pyramids  # noqa: E402
+from hawk_plan import axis_rows, read_many, rows_between  # noqa: E402
+from hawk_export import export  # noqa: E402
+from hawk_shard import merge_shards, shards  # noqa: E402
+from hawk_disk import cache_info, pin, unpin  # noqa: E402
+from hawk_stream import cpsd, stream  # noqa: E402
+import hawk_modal as modal  # noqa: E402
@@ -0,0 +1,129 @@
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# %% Executors
+
+# threads for HDF5 opens, lookups and reads (h5py serialises calls into HDF5)
+io_workers = 4
+# concurrent downloads per event loop
+download_limit = 4
+
+_executors = {}
+_loops = weakref.WeakKeyDictionary()
+
+
+def get_executor(kind):
+    """Dedicated thread pool for 'io' (HDF5) or 'download' (fetch and md5) work"""
+    if kind not in _executors:
+        workers = io_workers if kind == "io" else download_limit
+        _executors[kind] = ThreadPoolExecutor(
+            workers, thread_name_prefix=f"hawk-{kind}"
+        )
+    return _executors[kind]
+
+
+async def run(kind, func, *args, **kwargs):
+    """Await func(*args, **kwargs) run on the kind executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(kind), functools.partial(func, *args, **kwargs)
+    )
+
+
+def _state():
+    # download semaphore and in flight downloads of the running loop
+    loop = asyncio.get_running_loop()
+    if loop not in _loops:
+        _loops[loop] = (asyncio.Semaphore(download_limit), {})
+    return _loops[loop]
+
+
+# %% Downloads
+
+
+async def _download(key, data_dir):
+    import hawk
+
+    sem, _ = _state()
+    async with sem:
+        return await run("download", hawk.fetch, key, data_dir)
+
+
+async def aget_data_if_missing(key, data_dir):
+    """Async get_data_if_missing: verify or download key without blocking the loop.
+
+    At most download_limit downloads run at once. Concurrent calls for the
+    same file share one download (single flight); cancelling one caller does
+    not cancel the download for the others. Returns key if it was downloaded.
+    """
+    import hawk
+
+    if key not in hawk._lut():
+        return None
+    fname = os.path.join(data_dir, key + ".hdf5")
+    _, inflight = _state()
+    flight = os.path.abspath(fname)
+    task = inflight.get(flight)
+    if task is None:
+        if os.path.isfile(fname):
+            await run("download", hawk.verify, key, data_dir)
+            return None
+        task = asyncio.ensure_future(_download(key, data_dir))
+        inflight[flight] = task
+        task.add_done_callback(lambda _: inflight.pop(flight, None))
+    await asyncio.shield(task)
+    return key
+
+
+async def aprefetch(keys, data_dir="./hawk_data"):
+    """Async prefetch: download every series matching keys. Returns the keys downloaded."""
+    import hawk
+
+    os.makedirs(data_dir, exist_ok=True)
+    keys = hawk.resolve_keys(keys)
+    done = await asyncio.gather(*[aget_data_if_missing(k, data_dir) for k in keys])
+    return [k for k in done if k is not None]
+
+
+# %% Files
+
+
+async def aopen_campaign(campaign, data_dir="./hawk_data", **pool):
+    """Async open_campaign, downloading the header without blocking the loop"""
+    import hawk
+
+    os.makedirs(data_dir, exist_ok=True)
+    if not os.path.isfile(os.path.join(data_dir, f"{campaign}_store.hdf5")):
+        await aget_data_if_missing(f"{campaign}_header", data_dir)
+    return await run("io", hawk.open_campaign, campaign, data_dir, **pool)
+
+
+async def aopen_sbw(data_dir="./hawk_data", **pool):
+    return await aopen_campaign("SBW", data_dir, **pool)
+
+
+async def aopen_fst(data_dir="./hawk_data", **pool):
+    return await aopen_campaign("FST", data_dir, **pool)
+
+
+async def aget(group, name):
+    """Async group[name]: any missing series is downloaded first, then looked up"""
+    import hawk
+
+    pth, key = hawk.path_key(group.path, name)
+    data_dir = group.data_dir
+    target = None if group.pool is None else group.pool.target(pth)
+    if target is not None:
+        data_dir, fname = os.path.split(target[0])
+        key = os.path.splitext(fname)[0]
+    if not os.path.isfile(os.path.join(data_dir, key + ".hdf5")):
+        await aget_data_if_missing(key, data_dir)
+    return await run("io", hawk.lookup, group, name)
+
+
+async def aread(dset, sel=(), as_memmap=False):
+    """Async dset.read(sel) on the io executor"""
+    return await run("io", dset.read, sel, as_memmap)
@@ -0,0 +1,337 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from hawk_stats import count
+
+# %% Keys
+
+# default size limit of a store
+cache_bytes = 4 << 30
+# store directory, None for <data_dir of the first hawk argument>/derived
+cache_dir = None
+
+
+def _token(obj, sources):
+    # hashable description of an argument, collecting the files hawk objects live in
+    import hawk
+
+    if isinstance(obj, hawk.HawkObject):
+        fname = obj.file.filename
+        series = os.path.splitext(os.path.basename(fname))[0]
+        sources.append((fname, obj.data_dir))
+        return ("hawk", obj.path, hawk._lut().get(series, {}).get("md5"))
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return ("list", tuple(_token(o, sources) for o in obj.tolist()))
+        digest = hashlib.sha1(np.ascontiguousarray(obj).view(np.uint8)).hexdigest()
+        return ("array", obj.dtype.str, obj.shape, digest)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, slice):
+        return ("slice", obj.start, obj.stop, obj.step)
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, tuple(_token(o, sources) for o in obj))
+    if isinstance(obj, (set, frozenset)):
+        # iteration order follows the (per process) string hash, so sort
+        items = sorted((_token(o, sources) for o in obj), key=repr)
+        return (type(obj).__name__, tuple(items))
+    if isinstance(obj, dict):
+        items = ((_token(k, sources), _token(v, sources)) for k, v in obj.items())
+        return ("dict", tuple(sorted(items, key=repr)))
+    if hasattr(obj, "iloc"):  # pandas DataFrame or Series, e.g. from select()
+        import pandas as pd
+
+        digest = hashlib.sha1(pd.util.hash_pandas_object(obj).values).hexdigest()
+        labels = obj.columns if hasattr(obj, "columns") else [obj.name]
+        return (type(obj).__name__, tuple(map(str, labels)), digest)
+    if (
+        obj is None
+        or obj is Ellipsis
+        or isinstance(obj, (bool, int, float, complex, str, bytes))
+    ):
+        return obj
+    raise TypeError(f"can't key a cached call on a {type(obj).__name__} argument")
+
+
+def _code_token(code):
+    # marshal.dumps(code) isn't stable across processes: frozenset constants
+    # (e.g. `x in {"a", "b"}`) are written in string hash order
+    consts = tuple(
+        (
+            _code_token(c)
+            if hasattr(c, "co_code")
+            else sorted(map(repr, c)) if isinstance(c, frozenset) else repr(c)
+        )
+        for c in code.co_consts
+    )
+    return (code.co_code, consts, code.co_names)
+
+
+def func_id(func, version=None):
+    """Identity of func: its qualified name, version and a hash of its code"""
+    code = getattr(func, "__code__", None)
+    digest = None
+    if code is not None:
+        digest = hashlib.sha1(repr(_code_token(code)).encode()).hexdigest()
+    return (func.__module__, func.__qualname__, version, digest)
+
+
+def make_key(func, args, kwargs, version=None):
+    """(hex key, source files) of a call; sources are (filename, data_dir) pairs.
+
+    The key is the same in every process. Arguments that have no stable
+    description (anything but hawk objects, arrays, dataframes, plain values
+    and containers of those) raise TypeError.
+    """
+    sources = []
+    token = (func_id(func, version), _token(args, sources), _token(kwargs, sources))
+    key = hashlib.sha256(repr(token).encode()).hexdigest()
+    return key, sources
+
+
+# %% Store
+
+
+def _stamp(fname):
+    st = os.stat(fname)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _array(value):
+    return isinstance(value, (np.ndarray, np.generic)) and not value.dtype.hasobject
+
+
+def _plain(value):
+    # True for values that survive a JSON round trip unchanged
+    if value is None or type(value) in (bool, int, float, str):
+        return True
+    if type(value) is list:
+        return all(_plain(v) for v in value)
+    if type(value) is dict:
+        return all(type(k) is str and _plain(v) for k, v in value.items())
+    return False
+
+
+def _kind(value):
+    # how a result is stored: npy for an array, npz for a container of arrays
+    if _array(value):
+        return "npy"
+    if type(value) in (tuple, list) and value and all(map(_array, value)):
+        return "npz"
+    if type(value) is dict and value and all(map(_array, value.values())):
+        if all(type(k) is str for k in value):
+            return "npz"
+    if _plain(value):
+        return "json"
+    raise TypeError(
+        f"can't cache a {type(value).__name__} result: return an array, a tuple, "
+        "list or dict of arrays, or a JSON value (None, bool, int, float, str, "
+        "list, dict with str keys)"
+    )
+
+
+class Store:
+    """Directory of memoised results with LRU eviction beyond max_bytes.
+
+    Each entry is an .npy (array), .npz (tuple, list or dict of arrays) or
+    .value.json (plain value) file plus a .json holding the stamps (size,
+    mtime) of the files its inputs came from. Nothing is unpickled. An entry
+    whose source files changed is dropped on access. Use is tracked with the
+    mtime of the data file so several processes can share a store.
+    """
+
+    # data file suffix of each kind of entry, pkl from older versions
+    suffixes = {"npy": ".npy", "npz": ".npz", "json": ".value.json", "pkl": ".pkl"}
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = cache_bytes if max_bytes is None else max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, key):
+        # (meta, data file of each kind)
+        base = os.path.join(self.directory, key)
+        return base + ".json", {k: base + s for k, s in self.suffixes.items()}
+
+    def _load(self, key):
+        meta, data = self._paths(key)
+        with open(meta) as f:
+            m = json.load(f)
+        if m["kind"] == "pkl" or any(
+            _stamp(src) != stamp for src, stamp in m["sources"]
+        ):
+            # pickled by an older version, or a source file changed since
+            self.remove(key)
+            return False, None
+        fname = data[m["kind"]]
+        if m["kind"] == "json":
+            with open(fname) as f:
+                value = json.load(f)
+        elif m["kind"] == "npy":
+            value = np.load(fname)
+            value = value[()] if m["scalar"] else value
+        else:
+            with np.load(fname) as z:
+                items = [z[f"arr_{i}"] for i in range(len(m["names"]))]
+            items = [v[()] if s else v for v, s in zip(items, m["scalar"])]
+            if m["container"] == "dict":
+                value = dict(zip(m["names"], items))
+            else:
+                value = tuple(items) if m["container"] == "tuple" else items
+        os.utime(fname)  # mark as recently used
+        return True, value
+
+    def get(self, key):
+        """(True, value) for a valid entry, else (False, None)"""
+        try:
+            hit, value = self._load(key)
+        except (OSError, ValueError, KeyError):
+            hit, value = False, None
+        if hit:
+            self.hits += 1
+            count("memo.hits")
+        else:
+            self.misses += 1
+            count("memo.misses")
+        return hit, value
+
+    def put(self, key, value, sources=(), func=""):
+        """Store value under key; TypeError for results that can't be stored"""
+        kind = _kind(value)
+        os.makedirs(self.directory, exist_ok=True)
+        meta, data = self._paths(key)
+        m = {"func": func, "kind": kind, "sources": [[s, _stamp(s)] for s in sources]}
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(data[kind] + suffix, "wb") as f:
+            if kind == "json":
+                f.write(json.dumps(value).encode())
+            elif kind == "npy":
+                np.save(f, value)
+                m["scalar"] = isinstance(value, np.generic)
+            else:
+                is_dict = type(value) is dict
+                items = list(value.values()) if is_dict else list(value)
+                np.savez(f, *items)
+                m["container"] = type(value).__name__
+                m["names"] = list(value) if is_dict else list(range(len(items)))
+                m["scalar"] = [isinstance(v, np.generic) for v in items]
+        os.replace(data[kind] + suffix, data[kind])
+        with open(meta + suffix, "w") as f:
+            json.dump(m, f)
+        os.replace(meta + suffix, meta)
+        self.evict(keep=key)
+
+    def remove(self, key):
+        meta, data = self._paths(key)
+        for p in [meta, *data.values()]:
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    def entries(self):
+        """[(key, bytes, last use)] of the entries in the store"""
+        out = []
+        if not os.path.isdir(self.directory):
+            return out
+        for e in os.scandir(self.directory):
+            key, _, suffix = e.name.partition(".")
+            if "." + suffix in self.suffixes.values():
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                out.append((key, st.st_size, st.st_mtime_ns))
+        return out
+
+    def evict(self, keep=None):
+        """Remove the least recently used entries until the store fits max_bytes"""
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda e: e[2])
+            total = sum(e[1] for e in entries)
+            for key, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                if key != keep:
+                    self.remove(key)
+                    total -= size
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            self.remove(key)
+
+    def info(self):
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "bytes": sum(e[1] for e in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_stores = {}
+
+
+def get_store(directory, max_bytes=None):
+    """The Store for directory, shared by every cached function using it"""
+    directory = os.path.abspath(directory)
+    if directory not in _stores:
+        _stores[directory] = Store(directory, max_bytes)
+    elif max_bytes is not None:
+        _stores[directory].max_bytes = max_bytes
+    return _stores[directory]
+
+
+# %% API
+
+
+def cache(func=None, *, directory=None, max_bytes=None, version=None):
+    """Memoise a function of hawk datasets on disk.
+
+    Use as @cache or @cache(directory=..., max_bytes=..., version=...). Calls
+    are keyed by the header relative path and LUT md5 of every hawk object
+    among the arguments, the function (name, version and code) and all other
+    arguments. Results are kept in a Store in directory (default cache_dir,
+    else <data_dir>/derived) and are recomputed when the file a source object
+    lives in changes. max_bytes sets the size limit of that store, which is
+    shared by every function using the directory. The wrapper's
+    .store(*args) gives the Store a call uses.
+    """
+    if func is None:
+        return functools.partial(
+            cache, directory=directory, max_bytes=max_bytes, version=version
+        )
+
+    def store_for(sources):
+        d = directory or cache_dir
+        if d is None:
+            data_dir = sources[0][1] if sources else "./hawk_data"
+            d = os.path.join(data_dir or os.path.dirname(sources[0][0]), "derived")
+        return get_store(d, max_bytes)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key, sources = make_key(func, args, kwargs, version)
+        store = store_for(sources)
+        hit, value = store.get(key)
+        if hit:
+            return value
+        value = func(*args, **kwargs)
+        files = sorted({s[0] for s in sources})
+        store.put(key, value, files, f"{func.__module__}.{func.__qualname__}")
+        return value
+
+    def store(*args, **kwargs):
+        return store_for(make_key(func, args, kwargs, version)[1])
+
+    wrapper.store = store
+    return wrapper
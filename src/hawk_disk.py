@@ -0,0 +1,305 @@
+import json
+import os
+import shutil
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialised
+    fcntl = None
+
+from hawk_stats import count
+
+# %% Budget
+
+# byte budget of the series files, headers and downloads in progress in a
+# data_dir, None for no limit. Pyramid sidecars, consolidated stores and the
+# hawk.cache store (<data_dir>/derived, see hawk_cache.cache_bytes) are outside it.
+max_bytes = None
+# minimum seconds between access time updates of one series file
+touch_interval = 60.0
+# seconds a download's reservation counts before its .part file appears
+reservation_ttl = 60.0
+
+hits = misses = evictions = 0
+
+# live FilePools, which drop their handles on evicted files
+pools = weakref.WeakSet()
+
+_touched = {}
+_locks = defaultdict(threading.Lock)
+
+
+@contextmanager
+def file_lock(path, remove=False):
+    """Exclusive lock on the file path, shared by the threads and processes using it.
+
+    With remove the lock file is deleted on release, so locks taken once per
+    file (e.g. per download) don't pile up.
+    """
+    with _locks[os.path.abspath(path)]:
+        while True:
+            f = open(path, "a")
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()  # removed by its last holder while we waited, lock the new one
+        try:
+            yield
+        finally:
+            if remove:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+
+@contextmanager
+def locked(data_dir):
+    """Exclusive lock on data_dir, shared by the threads and processes using it"""
+    os.makedirs(data_dir, exist_ok=True)
+    with file_lock(os.path.join(data_dir, ".hawk.lock")):
+        yield
+
+
+def touch(fname):
+    """Record a use of a series file by setting its access time (the mtime is kept)"""
+    global hits
+    hits += 1
+    count("data_dir.hits")
+    now = time.monotonic()
+    if now - _touched.get(fname, -touch_interval) < touch_interval:
+        return
+    _touched[fname] = now
+    try:
+        os.utime(fname, ns=(time.time_ns(), os.stat(fname).st_mtime_ns))
+    except OSError:
+        pass
+
+
+def missed():
+    """Record a series file that had to be downloaded"""
+    global misses
+    misses += 1
+    count("data_dir.misses")
+
+
+# %% Pins
+
+
+def _pins_file(data_dir):
+    return os.path.join(data_dir, ".hawk_pins.json")
+
+
+def pinned(data_dir="./hawk_data"):
+    """The set of keys pinned in data_dir"""
+    try:
+        with open(_pins_file(data_dir)) as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def _write_pins(data_dir, keys):
+    tmp = f"{_pins_file(data_dir)}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(sorted(keys), f)
+    os.replace(tmp, _pins_file(data_dir))
+
+
+def pin(keys, data_dir="./hawk_data"):
+    """Never evict the series matching keys (e.g. 'BR_AR_*') from data_dir. Returns the pins."""
+    import hawk
+
+    with locked(data_dir):
+        pins = pinned(data_dir) | set(hawk.resolve_keys(keys))
+        _write_pins(data_dir, pins)
+    return pins
+
+
+def unpin(keys, data_dir="./hawk_data"):
+    """Allow the series matching keys to be evicted again. Returns the pins."""
+    import hawk
+
+    with locked(data_dir):
+        pins = pinned(data_dir) - set(hawk.resolve_keys(keys))
+        _write_pins(data_dir, pins)
+    return pins
+
+
+# %% Eviction
+
+
+def series_files(data_dir):
+    """[(key, bytes, last access)] of the evictable series files in data_dir.
+
+    Headers (*_header.hdf5) and files that aren't in the LUT are never listed.
+    """
+    import hawk
+
+    lut = hawk._lut()
+    out = []
+    if not os.path.isdir(data_dir):
+        return out
+    for e in os.scandir(data_dir):
+        key, ext = os.path.splitext(e.name)
+        if ext != ".hdf5" or key.endswith("_header") or key not in lut:
+            continue
+        try:
+            st = e.stat()
+        except FileNotFoundError:
+            continue
+        out.append((key, st.st_size, st.st_atime_ns))
+    return out
+
+
+def _reservation(fname):
+    return fname + ".reserved"
+
+
+# names <key><suffix> that count towards the budget
+_budgeted = (".hdf5", ".hdf5.part", ".hdf5.reserved")
+
+
+def disk_used(data_dir):
+    """Bytes of the LUT files in data_dir, counting downloads in progress at full size"""
+    import hawk
+
+    lut = hawk._lut()
+    sizes, reserved = {}, {}
+    if not os.path.isdir(data_dir):
+        return 0
+    for e in os.scandir(data_dir):
+        # only <key>.hdf5 and its download; derived files (pyramids, stores,
+        # caches, locks) aren't budgeted
+        suffix = next(
+            (s for s in _budgeted if e.name.endswith(s) and e.name[: -len(s)] in lut),
+            None,
+        )
+        try:
+            if suffix in (".hdf5", ".hdf5.part"):
+                sizes[e.name] = e.stat().st_size
+            elif suffix == ".hdf5.reserved":
+                with open(e.path) as f:
+                    reserved[e.name[: -len(".reserved")]] = (
+                        int(f.read() or 0),
+                        e.stat().st_mtime,
+                    )
+        except (OSError, ValueError):
+            pass
+    total = sum(sizes.values())
+    now = time.time()
+    for name, (nbytes, mtime) in reserved.items():
+        part = name + ".part"
+        # a reservation without a .part is only trusted briefly (its process may have died)
+        if part in sizes or now - mtime < reservation_ttl:
+            total += max(nbytes - sizes.get(part, 0), 0)
+    return total
+
+
+def _evict(data_dir, nbytes, keep, budget):
+    # evict LRU series until nbytes more fit, with data_dir locked
+    global evictions
+    import hawk
+    import hawk_pyramid
+
+    out = []
+    used = disk_used(data_dir)
+    if used + nbytes <= budget:
+        return out
+    protect = pinned(data_dir) | set(keep)
+    for key, size, _ in sorted(series_files(data_dir), key=lambda e: e[2]):
+        if used + nbytes <= budget:
+            break
+        if key in protect:
+            continue
+        fname = os.path.join(data_dir, key + ".hdf5")
+        try:
+            os.remove(fname)
+        except OSError:  # gone already, or open elsewhere on Windows
+            continue
+        try:
+            os.remove(fname + ".stamp")  # stamps and pyramids are stale without it
+        except OSError:
+            pass
+        shutil.rmtree(hawk_pyramid.sidecar_dir(fname), ignore_errors=True)
+        hawk_pyramid.discard(fname)
+        for pool in list(pools):
+            pool.discard(fname)
+        _touched.pop(fname, None)
+        used -= size
+        out.append(key)
+    if out:
+        # indexes and attrs cached in memory may point into the evicted files
+        hawk._indexes.clear()
+        hawk._attrs_cache.clear()
+    evictions += len(out)
+    count("data_dir.evictions", len(out))
+    return out
+
+
+def make_room(data_dir, nbytes=0, keep=(), budget=None):
+    """Evict the least recently used series until nbytes more fit in the budget.
+
+    budget defaults to max_bytes (no limit when None). Pinned series, keep
+    and the headers are never evicted, so the budget can still be exceeded
+    when they alone fill it. Returns the evicted keys.
+    """
+    budget = max_bytes if budget is None else budget
+    if budget is None:
+        return []
+    with locked(data_dir):
+        return _evict(data_dir, nbytes, keep, budget)
+
+
+def reserve(data_dir, key, nbytes):
+    """Make room for a download of nbytes in total and count it as used until release()"""
+    missed()
+    if max_bytes is None:
+        return []
+    fname = os.path.join(data_dir, key + ".hdf5")
+    with locked(data_dir):
+        part = fname + ".part"
+        have = os.path.getsize(part) if os.path.isfile(part) else 0
+        evicted = _evict(data_dir, max(nbytes - have, 0), [key], max_bytes)
+        with open(_reservation(fname), "w") as f:
+            f.write(str(nbytes))
+    return evicted
+
+
+def release(data_dir, key):
+    """Drop the reservation of a finished (or failed) download"""
+    try:
+        os.remove(_reservation(os.path.join(data_dir, key + ".hdf5")))
+    except FileNotFoundError:
+        pass
+
+
+# %% API
+
+
+def cache_info(data_dir="./hawk_data"):
+    """Use of data_dir: hits (accesses to downloaded series), misses (downloads),
+    evictions, disk used, budget and pins. Counts are for this process.
+    """
+    return {
+        "data_dir": os.path.abspath(data_dir),
+        "hits": hits,
+        "misses": misses,
+        "evictions": evictions,
+        "files": len(series_files(data_dir)),
+        "bytes": disk_used(data_dir),
+        "max_bytes": max_bytes,
+        "pinned": sorted(pinned(data_dir)),
+    }
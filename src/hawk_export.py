@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from hawk_store import auto_chunks
+from hawk_stream import block_rows, iter_blocks
+
+# %% Selection
+
+# selection columns that describe the dataset rather than hold metadata
+_skip = {"path", "shape", "dtype"}
+
+
+def _rows(data, selection):
+    # [{path, **metadata}] from a select() dataframe or paths / globs of paths
+    import hawk
+
+    if hasattr(selection, "to_dict"):
+        return selection.to_dict("records")
+    if isinstance(selection, str):
+        selection = [selection]
+    rows = []
+    for p in selection:
+        if any(c in p for c in "*?["):
+            hits = hawk.catalogue(data, p, kind="dataset")
+            rows.extend({"path": k} for k in sorted(hits))
+        else:
+            rows.append({"path": p})
+    return rows
+
+
+def _value(v):
+    # JSON / single column friendly version of a metadata value
+    if isinstance(v, bytes):
+        return v.decode()
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, np.ndarray):
+        return v.tolist()
+    return v
+
+
+def _metadata(dset, row):
+    out = {k: _value(v) for k, v in dset.setup().items()}
+    out |= {k: _value(v) for k, v in row.items() if k not in _skip}
+    return out
+
+
+def _axis(data, path, axes):
+    # (name, values) of the x axis of an SBW dataset (LMS/xData/freq, NI/xData/time)
+    top = path.split("/")[0]
+    if top not in axes:
+        axes[top] = None
+        xdata = f"{top}/xData"
+        if xdata in data and len(data[xdata]) == 1:
+            name = list(data[xdata].keys())[0]
+            axes[top] = (name, f"{xdata}/{name}", data[f"{xdata}/{name}"][()])
+    return axes[top]
+
+
+# %% Writers
+
+
+def _parquet(dset, meta, axis, fname, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    # a leading dot keeps unfinished files out of pyarrow.dataset discovery
+    tmp = os.path.join(os.path.dirname(fname), "." + os.path.basename(fname) + ".part")
+    writer = None
+    start = 0
+    for block in iter_blocks(dset, rows, readahead=1):
+        n = len(block)
+        block = block.reshape(n, -1)
+        r = block.shape[1]
+        cols = {
+            "row": np.repeat(np.arange(start, start + n), r),
+            "repeat": np.tile(np.arange(r, dtype=np.int32), n),
+        }
+        if axis is not None:
+            cols[axis[0]] = np.repeat(axis[2][start : start + n], r)
+        v = block.ravel()
+        if np.iscomplexobj(v):
+            cols["real"], cols["imag"] = v.real, v.imag
+        else:
+            cols["value"] = v
+        table = pa.table(cols)
+        zeros = pa.array(np.zeros(len(v), dtype=np.int32))
+        for k, val in meta.items():
+            # constant per dataset, so dictionary encoded to a single value
+            values = pa.array([val if isinstance(val, (int, float)) else str(val)])
+            table = table.append_column(
+                k, pa.DictionaryArray.from_arrays(zeros, values)
+            )
+        if writer is None:
+            writer = pq.ParquetWriter(tmp, table.schema)
+        writer.write_table(table)
+        start += n
+    if writer is None:  # empty dataset
+        pq.write_table(pa.table({"row": pa.array([], pa.int64())}), tmp)
+    else:
+        writer.close()
+    os.replace(tmp, fname)
+
+
+def _create(root, path, **kwargs):
+    # zarr 3 create_array, zarr 2 create_dataset
+    create = getattr(root, "create_array", None) or root.create_dataset
+    return create(path, overwrite=True, **kwargs)
+
+
+def _zarr(dset, meta, root, path, lock):
+    chunks = auto_chunks(dset.shape, dset.dtype) or dset.shape
+    with lock:
+        arr = _create(root, path, shape=dset.shape, dtype=dset.dtype, chunks=chunks)
+        arr.attrs.update(meta)
+    if not dset.shape:
+        arr[()] = dset[()]
+        return
+    rows = block_rows(dset, chunks[0])
+    rows = max(chunks[0], rows // chunks[0] * chunks[0])
+    start = 0
+    for block in iter_blocks(dset, rows, readahead=1):
+        arr[start : start + len(block)] = block
+        start += len(block)
+
+
+# %% API
+
+
+def export(data, selection, fmt="parquet", out="hawk_export", workers=4):
+    """Stream selected datasets to Parquet or Zarr.
+
+    selection is a select() dataframe or dataset paths (globs are matched
+    against the path index). Each dataset is read in blocks of about
+    hawk_stream.block_bytes, so memory use does not grow with the selection.
+
+    parquet: out is a directory with one file per dataset (out/<path>.parquet)
+    in long form, with columns row, repeat, the x axis (time or freq for SBW)
+    and value (real and imag for complex data). The setup() metadata and the
+    other selection columns (e.g. the FST csv metadata) become constant,
+    dictionary encoded columns. Read it back with pyarrow.dataset.dataset(out).
+
+    zarr: out is a Zarr store with one array per dataset at its path, with the
+    metadata as attrs. The SBW x axes are copied to their header paths.
+
+    Series files are exported in parallel by workers threads. Finished
+    datasets are recorded with the stamp of their source file in
+    <out>.manifest.json, so rerunning an interrupted export only redoes the
+    unfinished (or changed) ones. Returns the manifest.
+    """
+    import hawk
+
+    if fmt not in ("parquet", "zarr"):
+        raise ValueError(f"unknown format {fmt!r}, expected 'parquet' or 'zarr'")
+    if fmt == "zarr":
+        import zarr
+
+        root = zarr.open_group(out, mode="a")
+    else:
+        import pyarrow  # noqa: F401  fail early if the optional dependency is missing
+
+        os.makedirs(out, exist_ok=True)
+        root = None
+    manifest_file = out.rstrip("/\\") + ".manifest.json"
+    manifest = {"format": fmt, "done": {}}
+    if os.path.isfile(manifest_file):
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        if manifest["format"] != fmt:
+            raise ValueError(f"{out} is a {manifest['format']} export")
+    lock = threading.Lock()
+    axes = {}
+
+    def done(path, stamp):
+        with lock:
+            manifest["done"][path] = stamp
+            tmp = f"{manifest_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, manifest_file)
+
+    # one task per series file, downloaded (if missing) by the task itself
+    tasks = {}
+    for row in _rows(data, selection):
+        fname, _ = hawk.resolve(data, row["path"], download=False)
+        tasks.setdefault(fname, []).append(row)
+
+    def run(fname, rows):
+        for row in rows:
+            path = row["path"]
+            if manifest["done"].get(path) == list(hawk._stat(fname) or ()):
+                continue
+            dset = data[path]
+            stamp = list(hawk._stat(fname))
+            meta = _metadata(dset, row)
+            with lock:
+                axis = _axis(data, path, axes)
+            if fmt == "parquet":
+                target = os.path.join(out, *path.split("/")) + ".parquet"
+                _parquet(dset, meta, axis, target, block_rows(dset, 1))
+            else:
+                if axis is not None:
+                    with lock:
+                        if axis[1] not in root:
+                            _create(root, axis[1], data=axis[2])
+                _zarr(dset, meta, root, path, lock)
+            done(path, stamp)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fut in [pool.submit(run, f, rows) for f, rows in tasks.items()]:
+            fut.result()
+    return manifest
@@ -0,0 +1,179 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+# %% Rational fraction polynomial
+
+
+# Hermitian transpose
+def HT(a):
+    return a.conj().T
+
+
+# Rational fraction polynomial model (single FRF, as in the example notebooks)
+def RFP(H, w, n_modes, oob_terms=0):
+    # Specify the orders of our approximation
+    # number of coefficients in the numerator and denominator polynomials
+    m = 1 + (n_modes * 2) + oob_terms
+    n = 1 + (n_modes * 2)
+
+    # Build monomial basis matricies
+    Phi_a = basis(w, m)
+    Phi_b = basis(w, n)
+
+    P = Phi_a
+    T = Phi_b[:, :-1] * H[:, None]
+    W = Phi_b[:, -1] * H
+    PT = -HT(P) @ T
+
+    # form the block matricies
+    M = np.block([[HT(P) @ P, PT], [PT.T, HT(T) @ T]])
+    x = np.block([HT(P) @ W, -HT(T) @ W])
+
+    # Solve and extract the coefficients of the polynomials
+    AB = np.linalg.solve(np.real(M), np.real(x))
+    a = AB[:m, None]
+    b = np.append(AB[m:], 1)[:, None]
+
+    # Generate the predicted FRF
+    H_pred = (Phi_a @ a) / (Phi_b @ b)
+
+    # Pull out the modal porperties
+    roots_b = sorted(np.roots(np.flip(b[:, 0])))[::-2]  # remove conj pairs
+    wns = np.abs(roots_b)
+    zetas = -np.real(roots_b) / wns
+    return H_pred, wns, zetas
+
+
+@lru_cache(maxsize=256)
+def _basis(wbytes, dtype, order):
+    w = np.frombuffer(wbytes, dtype=dtype)
+    out = (1j * w[:, None]) ** np.arange(order)
+    out.flags.writeable = False
+    return out
+
+
+def basis(w, order):
+    """Monomial basis (iw)^k, k < order, cached per (w, order)"""
+    w = np.ascontiguousarray(w)
+    return _basis(w.tobytes(), w.dtype.str, order)
+
+
+def _roots(b):
+    # batched np.roots for monic polynomials with ascending coefficients b
+    c = np.flip(b, -1)
+    k = c.shape[-1] - 1
+    A = np.zeros(c.shape[:-1] + (k, k))
+    A[..., 0, :] = -c[..., 1:] / c[..., :1]
+    A[..., np.arange(1, k), np.arange(k - 1)] = 1
+    return np.linalg.eigvals(A)
+
+
+def rfp_batch(H, w, n_modes, oob_terms=0):
+    """RFP fit of many FRFs sharing one frequency axis.
+
+    H is (..., len(w)). All the normal equations are formed together from the
+    cached bases and solved with one batched np.linalg.solve. Returns the
+    natural frequencies and damping ratios, each of shape (..., n_modes),
+    identical to calling RFP on each FRF in turn.
+    """
+    H = np.asarray(H)
+    lead = H.shape[:-1]
+    H = H.reshape(-1, H.shape[-1])
+    m = 1 + (n_modes * 2) + oob_terms
+    n = 1 + (n_modes * 2)
+    P = basis(w, m)
+    Phi_b = basis(w, n)
+    Pb, pl = Phi_b[:, :-1], Phi_b[:, -1]
+    H2 = np.abs(H) ** 2
+
+    PT = -np.real((HT(P)[None] * H[:, None, :]) @ Pb)
+    TT = np.real((HT(Pb)[None] * H2[:, None, :]) @ Pb)
+    M = np.empty((len(H), m + n - 1, m + n - 1))
+    M[:, :m, :m] = np.real(HT(P) @ P)
+    M[:, :m, m:] = PT
+    M[:, m:, :m] = PT.transpose(0, 2, 1)
+    M[:, m:, m:] = TT
+    x = np.concatenate(
+        [np.real((H * pl) @ P.conj()), -np.real((H2 * pl) @ Pb.conj())], axis=1
+    )
+
+    AB = np.linalg.solve(M, x[..., None])[..., 0]
+    b = np.concatenate([AB[:, m:], np.ones((len(H), 1))], axis=1)
+    roots = np.sort(_roots(b), axis=-1)[:, ::-1][:, ::2]
+    wns = np.abs(roots)
+    zetas = -np.real(roots) / wns
+    return wns.reshape(*lead, n_modes), zetas.reshape(*lead, n_modes)
+
+
+def band(ws, low, high):
+    """Slice of the (sorted) frequency axis ws strictly between low and high"""
+    return slice(np.searchsorted(ws, low, "right"), np.searchsorted(ws, high, "left"))
+
+
+def get_wns(ranges, ws, frf, oob=0):
+    """Natural frequencies and damping of FRFs (..., len(ws)) fitted band by band.
+
+    ranges is a sequence of ((low, high), n_modes) as in the example notebooks.
+    Returns (wns, zetas), each (..., total modes).
+    """
+    wns, zetas = [], []
+    for (low, high), n in ranges:
+        idx = band(ws, low, high)
+        wn, zeta = rfp_batch(frf[..., idx], ws[idx], n, oob_terms=oob)
+        wns.append(wn)
+        zetas.append(zeta)
+    return np.concatenate(wns, -1), np.concatenate(zetas, -1)
+
+
+# %% Campaign sweeps
+
+ModalResult = namedtuple("ModalResult", ["wns", "zetas", "coords"])
+
+
+def identify(data, series, sensors, ranges, repeats=None, oob=0, workers=None):
+    """Identify the modes of every test of the given SBW series from the LMS FRFs.
+
+    The FRFs of each series are read in one batched load (hawk.stack), limited
+    to the frequency rows spanned by ranges, and fitted with get_wns. Returns
+    a ModalResult of (test, sensor, repeat, mode) arrays with coords labelling
+    each axis. With workers > 1 both the reads and the fits are spread over a
+    process pool.
+    """
+    import hawk
+    import hawk_plan
+
+    if isinstance(series, str):
+        series = [series]
+    sensors = list(sensors)
+    ws = data["LMS/xData/freq"][:]
+    rows = hawk_plan.rows_between(
+        ws, min(low for (low, _), _ in ranges), max(high for (_, high), _ in ranges)
+    )
+    ws = ws[rows]
+    tests = [f"{s}/{t}" for s in series for t in data[f"LMS/{s}"].keys()]
+    grid = [[f"LMS/{t}/{sensor}/frf" for sensor in sensors] for t in tests]
+    frfs, _ = hawk.stack(data, grid, workers=workers, rows=rows)
+    if repeats is not None:
+        frfs = frfs[:, list(repeats)]
+    # (freq, repeats, tests, sensors) -> (tests, sensors, repeats, freq)
+    frfs = np.ascontiguousarray(frfs.transpose(2, 3, 1, 0))
+    if workers is not None and workers > 1:
+        import hawk_parallel
+
+        pool = hawk_parallel.get_pool(workers)
+        parts = np.array_split(frfs, min(workers, len(frfs)))
+        futs = [pool.submit(get_wns, ranges, ws, p, oob) for p in parts]
+        res = [f.result() for f in futs]
+        wns = np.concatenate([r[0] for r in res])
+        zetas = np.concatenate([r[1] for r in res])
+    else:
+        wns, zetas = get_wns(ranges, ws, frfs, oob)
+    coords = {
+        "test": tests,
+        "sensor": sensors,
+        "repeat": list(range(frfs.shape[2])) if repeats is None else list(repeats),
+        "mode": [i for i, (_, n) in enumerate(ranges) for _ in range(n)],
+    }
+    return ModalResult(wns, zetas, coords)
@@ -0,0 +1,143 @@
+import atexit
+import multiprocessing as mp
+import os
+import posixpath as pp
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import h5py
+import numpy as np
+
+# %% Worker side
+
+# one handle per external file, kept open for the lifetime of the worker
+_files = {}
+
+
+def _attach(name):
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 always registers the block, but spawned workers share the
+        # parent's resource tracker so the parent's unlink clears it again
+        return SharedMemory(name=name)
+
+
+def _read(shm_name, shape, dtype, fname, reads):
+    st = os.stat(fname)
+    ident = (st.st_dev, st.st_ino)
+    if fname not in _files or _files[fname][1] != ident:
+        # first use, or the file was replaced (e.g. evicted and downloaded again)
+        _files[fname] = (h5py.File(fname, "r"), ident)
+    f = _files[fname][0]
+    shm = _attach(shm_name)
+    try:
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        for internal, src, sel in reads:
+            d = f[internal]
+            if d.dtype == dtype:
+                d.read_direct(out, source_sel=src, dest_sel=sel)
+            else:
+                out[sel] = d[src]
+        del out
+    finally:
+        shm.close()
+    return len(reads)
+
+
+# %% Pool management
+
+_pools = {}
+
+
+def get_pool(workers):
+    """Persistent spawn-based process pool so workers keep their open files between calls"""
+    if workers not in _pools:
+        _pools[workers] = ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp.get_context("spawn")
+        )
+    return _pools[workers]
+
+
+@atexit.register
+def shutdown():
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown()
+
+
+def split_tasks(files, workers):
+    """One task per external file, split further when there are fewer files than workers"""
+    n = max(1, -(-workers // max(len(files), 1)))
+    tasks = []
+    for fname, reads in files.items():
+        size = -(-len(reads) // n)
+        tasks.extend((fname, reads[k : k + size]) for k in range(0, len(reads), size))
+    return tasks
+
+
+# %% API
+
+# what stack_layout needs to know about a dataset
+Layout = namedtuple("Layout", ["shape", "dtype", "ndim"])
+
+
+def _layout(data, idx, path):
+    # shape and dtype of the dataset at path from the index, opened only if absent
+    e = idx.get(pp.normpath(pp.join(data.path, path)).strip("/"))
+    if e is None or e["kind"] != "dataset":
+        d = data[path]
+        return Layout(d.shape, d.dtype, d.ndim)
+    return Layout(tuple(e["shape"]), np.dtype(e["dtype"]), len(e["shape"]))
+
+
+def gather(data, paths, fill_value=np.nan, workers=None, rows=None):
+    """Parallel version of hawk.stack.
+
+    The datasets are grouped by the external series file they live in and read
+    by a pool of worker processes directly into a shared memory block laid out
+    as the (time, repeats, tests, channels) result. The returned array is that
+    block, so the result is never copied; it is unmapped once the array (and
+    every view of it) is gone. Shapes come from the path index, so the parent
+    doesn't open the series files.
+    """
+    import hawk
+
+    workers = workers or os.cpu_count()
+    # resolving downloads any missing series, so the index below covers them all
+    targets = [[hawk.resolve(data, p) for p in row] for row in paths]
+    idx = hawk.index(data)
+    dsets = [[_layout(data, idx, p) for p in row] for row in paths]
+    shape, dtype, lengths, ragged = hawk.stack_layout(dsets, fill_value, rows)
+    files = {}
+    for i, row in enumerate(targets):
+        for j, (fname, internal) in enumerate(row):
+            d = dsets[i][j]
+            src = hawk.stack_rows(d.shape[0], rows)
+            sel = hawk.stack_sel(d.ndim, lengths[i, j], i, j)
+            files.setdefault(fname, []).append((internal, src, sel))
+
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    shm = SharedMemory(create=True, size=max(nbytes, 1))
+    try:
+        out = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        if ragged:
+            out.fill(fill_value)
+        pool = get_pool(workers)
+        futs = [
+            pool.submit(_read, shm.name, shape, dtype, fname, reads)
+            for fname, reads in split_tasks(files, workers)
+        ]
+        for fut in futs:
+            fut.result()
+    except BaseException:
+        out = None  # drop the view so the block can be closed
+        shm.close()
+        raise
+    finally:
+        # the workers are done with the block; the mapping lives on in out
+        shm.unlink()
+    weakref.finalize(out, shm.close)
+    return out, lengths
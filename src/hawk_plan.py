@@ -0,0 +1,150 @@
+from collections import namedtuple
+
+import numpy as np
+
+# %% Value based selection
+
+# cached x axes keyed by (header filename, axis path)
+_axes = {}
+
+
+def rows_between(axis, low=None, high=None):
+    """Slice of the rows of a sorted axis with low <= axis <= high"""
+    axis = np.asarray(axis)
+    start = 0 if low is None else int(np.searchsorted(axis, low, "left"))
+    stop = len(axis) if high is None else int(np.searchsorted(axis, high, "right"))
+    return slice(start, max(start, stop))
+
+
+def axis_of(data, path):
+    """The x axis (LMS/xData/freq or NI/xData/time) of an SBW dataset path, or None"""
+    top = path.strip("/").split("/")[0]
+    key = (data.file.filename, top)
+    if key not in _axes:
+        xdata = f"{top}/xData"
+        values = None
+        if xdata in data and len(data[xdata]) == 1:
+            values = data[f"{xdata}/{list(data[xdata].keys())[0]}"][()]
+        _axes[key] = values
+    return _axes[key]
+
+
+def axis_rows(data, path, low=None, high=None):
+    """Rows of the SBW dataset at path between the values low and high of its x axis"""
+    axis = axis_of(data, path)
+    if axis is None:
+        raise KeyError(f"no xData axis for {path}")
+    return rows_between(axis, low, high)
+
+
+# %% Planning
+
+Request = namedtuple("Request", ["start", "stop", "cols", "squeeze"])
+Read = namedtuple("Read", ["start", "stop", "cols", "members"])
+
+
+def request(sel, shape):
+    """Normalise a (rows, columns) selection of a 1 or 2-D dataset, or None if it can't be planned.
+
+    rows is an int or a slice with step 1, columns anything numpy accepts
+    along one axis (int, slice, list of ints).
+    """
+    sel = sel if isinstance(sel, tuple) else (sel,)
+    if len(sel) > len(shape) or len(shape) > 2 or Ellipsis in sel:
+        return None
+    rows = sel[0] if sel else slice(None)
+    squeeze = [False, False]
+    if isinstance(rows, (int, np.integer)):
+        start = rows + shape[0] if rows < 0 else int(rows)
+        stop, squeeze[0] = start + 1, True
+    elif isinstance(rows, slice):
+        start, stop, step = rows.indices(shape[0])
+        if step != 1:
+            return None
+        stop = max(start, stop)
+    else:
+        return None
+    cols = None
+    if len(shape) == 2:
+        c = sel[1] if len(sel) > 1 else slice(None)
+        squeeze[1] = isinstance(c, (int, np.integer))
+        cols = np.atleast_1d(np.arange(shape[1])[c])
+    return Request(start, stop, cols, tuple(squeeze))
+
+
+def plan(requests, chunk_rows=None):
+    """Coalesce requests on one dataset into reads in chunk order.
+
+    Requests whose row ranges overlap, or fall within one chunk of each other,
+    are merged into a single read of the union of their rows and columns.
+    Returns Read(start, stop, cols, members) tuples sorted by row, cols being
+    the sorted columns to read (None for a 1-D dataset) and members the
+    indices of the requests it serves.
+    """
+    gap = chunk_rows or 0
+    order = sorted(range(len(requests)), key=lambda i: requests[i].start)
+    reads = []
+    for i in order:
+        r = requests[i]
+        if reads and r.start <= reads[-1][1] + gap:
+            reads[-1][1] = max(reads[-1][1], r.stop)
+            reads[-1][3].append(i)
+        else:
+            reads.append([r.start, r.stop, None, [i]])
+    out = []
+    for start, stop, _, members in reads:
+        cols = None
+        if requests[members[0]].cols is not None:
+            cols = np.unique(np.concatenate([requests[i].cols for i in members]))
+        out.append(Read(start, stop, cols, members))
+    return out
+
+
+def _col_sel(cols):
+    # one hyperslab when the columns are dense, else a point selection
+    if cols[-1] - cols[0] + 1 <= 2 * len(cols):
+        return slice(int(cols[0]), int(cols[-1]) + 1), cols - cols[0]
+    return list(cols), np.arange(len(cols))
+
+
+# %% API
+
+
+def read_many(dset, sels):
+    """Read several selections of one dataset with as few hyperslab reads as possible.
+
+    Selections are (rows, columns) as accepted by request(). They are merged
+    by plan() and each read's result is scattered back, so e.g. reading
+    frf[:, i] for every repeat i costs one read instead of one strided read
+    per repeat. Selections that can't be planned are read as they are.
+    Returns the arrays in the order of sels.
+    """
+    shape = dset.shape
+    reqs = [request(s, shape) for s in sels]
+    out = [None] * len(sels)
+    plannable = [i for i, r in enumerate(reqs) if r is not None]
+    for i, r in enumerate(reqs):
+        if r is None:
+            out[i] = dset[sels[i]]
+    chunks = dset.chunks
+    reads = plan([reqs[i] for i in plannable], chunks[0] if chunks else None)
+    for read in reads:
+        members = [plannable[m] for m in read.members]
+        if read.cols is None:
+            buf = dset[read.start : read.stop]
+        else:
+            colsel, pos = _col_sel(read.cols)
+            buf = dset[read.start : read.stop, colsel]
+            lookup = np.empty(shape[1], dtype=int)
+            lookup[read.cols] = pos
+        for i in members:
+            r = reqs[i]
+            a = buf[r.start - read.start : r.stop - read.start]
+            if r.cols is not None:
+                a = a[:, lookup[r.cols]]
+            if r.squeeze[0]:
+                a = a[0]
+            if r.squeeze[1]:
+                a = a[..., 0]
+            out[i] = a
+    return out
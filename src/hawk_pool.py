@@ -0,0 +1,129 @@
+import os
+import posixpath as pp
+import threading
+from collections import OrderedDict
+
+import h5py
+
+import hawk_disk
+from hawk_stats import count
+
+# %% Pool
+
+# default number of series files a campaign keeps open
+pool_size = 32
+
+
+def header_links(f):
+    """External links in a header file as {header path: (filename, target path)}"""
+    links = {}
+
+    def walk(g, prefix):
+        for k in g.keys():
+            pth = pp.join(prefix, k)
+            link = g.get(k, getlink=True)
+            if isinstance(link, h5py.ExternalLink):
+                links[pth] = (link.filename, link.path)
+            elif g.get(k, getclass=True) is h5py.Group:
+                walk(g.get(k), pth)
+
+    walk(f, "")
+    return links
+
+
+class FilePool:
+    """LRU pool of open series files shared by every lookup through one campaign.
+
+    Lookups under an external link of the header are served from the series
+    file held here rather than letting HDF5 reopen it on every traversal.
+    Each file is opened with the given raw data chunk cache settings
+    (rdcc_nbytes, rdcc_nslots, rdcc_w0; None keeps the h5py default). At
+    most size files are held; evicting a file only drops the pool's handle,
+    so objects already taken from it stay valid. A held file that has been
+    removed or replaced on disk (e.g. evicted from data_dir by another
+    process) is reopened on its next use.
+    """
+
+    def __init__(
+        self, header, size=None, rdcc_nbytes=None, rdcc_nslots=None, rdcc_w0=None
+    ):
+        self.header = header
+        self.size = pool_size if size is None else size
+        self.rdcc = {
+            "rdcc_nbytes": rdcc_nbytes,
+            "rdcc_nslots": rdcc_nslots,
+            "rdcc_w0": rdcc_w0,
+        }
+        self.hits = self.misses = self.evictions = 0
+        self._files = OrderedDict()
+        self._links = None
+        self._lock = threading.Lock()
+        hawk_disk.pools.add(self)
+
+    @property
+    def links(self):
+        """{header path: (absolute filename, target path)} of the header's external links"""
+        if self._links is None:
+            base = os.path.dirname(self.header)
+            with h5py.File(self.header, "r") as f:
+                links = header_links(f)
+            self._links = {
+                k: (os.path.normpath(os.path.join(base, fname)), target)
+                for k, (fname, target) in links.items()
+            }
+        return self._links
+
+    def target(self, pth):
+        """(filename, internal path) for a header path under an external link, else None"""
+        links = self.links
+        parts = pth.split("/")
+        for i in range(1, len(parts) + 1):
+            hit = links.get("/".join(parts[:i]))
+            if hit is not None:
+                return hit[0], pp.join(hit[1], *parts[i:])
+        return None
+
+    def get(self, fname):
+        """Open h5py.File for fname, from the pool if it is held"""
+        with self._lock:
+            st = os.stat(fname)  # FileNotFoundError for a missing series
+            held = self._files.get(fname)
+            if held is not None:
+                f, ident = held
+                if f.id.valid and ident == (st.st_dev, st.st_ino):
+                    self._files.move_to_end(fname)
+                    self.hits += 1
+                    count("pool.hits")
+                    return f
+                del self._files[fname]  # removed or replaced since it was opened
+            f = h5py.File(fname, "r", **self.rdcc)
+            self.misses += 1
+            count("pool.misses")
+            self._files[fname] = (f, (st.st_dev, st.st_ino))
+            while len(self._files) > self.size:
+                self._files.popitem(last=False)
+                self.evictions += 1
+            return f
+
+    def discard(self, fname):
+        """Drop the handle on fname if it is held"""
+        fname = os.path.abspath(fname)
+        with self._lock:
+            for k in [k for k in self._files if os.path.abspath(k) == fname]:
+                del self._files[k]
+
+    def clear(self):
+        """Drop every held file"""
+        with self._lock:
+            self._files.clear()
+
+    def stats(self):
+        n = self.hits + self.misses
+        return {
+            "size": self.size,
+            "open": len(self._files),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / n if n else 0.0,
+        }
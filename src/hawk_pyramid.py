@@ -0,0 +1,275 @@
+import os
+import threading
+import warnings
+from collections import namedtuple
+
+import h5py
+import numpy as np
+
+from hawk_stream import block_rows, iter_blocks
+
+# %% Levels
+
+# rows per block at level 0 (2**base_level) and the coarsest level's target size
+base_level = 4
+min_blocks = 64
+
+Overview = namedtuple("Overview", ["x", "min", "max", "mean", "step"])
+
+
+def _counts(n, block):
+    # rows covered by each block of a level
+    c = np.full(-(-n // block), block)
+    c[-1] = n - block * (len(c) - 1)
+    return c
+
+
+def _reduce(x, block):
+    # (min, max, mean) over consecutive blocks of rows of x, the last may be partial
+    full = len(x) // block * block
+    parts = []
+    if full:
+        b = x[:full].reshape(-1, block, *x.shape[1:])
+        parts.append((b.min(1), b.max(1), b.mean(1)))
+    if full < len(x):
+        r = x[full:]
+        parts.append((r.min(0)[None], r.max(0)[None], r.mean(0)[None]))
+    return [np.concatenate(p) for p in zip(*parts)]
+
+
+def _combine(lo, hi, mean, counts):
+    # next level up from pairs of blocks, weighting the means by rows covered
+    n = len(lo)
+    if n % 2:
+        pad = [(0, 1)] + [(0, 0)] * (lo.ndim - 1)
+        lo = np.pad(lo, pad, mode="edge")
+        hi = np.pad(hi, pad, mode="edge")
+        mean = np.pad(mean, pad)
+        counts = np.append(counts, 0)
+    w = counts.reshape(-1, 2, *[1] * (mean.ndim - 1))
+    mean = mean.reshape(-1, 2, *mean.shape[1:])
+    return (
+        lo.reshape(-1, 2, *lo.shape[1:]).min(1),
+        hi.reshape(-1, 2, *hi.shape[1:]).max(1),
+        (mean * w).sum(1) / w.sum(1),
+    )
+
+
+def _envelope_dtype(dset):
+    # complex data (FRFs) is summarised by its magnitude, integers by floats
+    dtype = np.abs(np.zeros(0, dset.dtype)).dtype
+    return dtype if dtype.kind == "f" else np.dtype(float)
+
+
+def levels(dset):
+    """Block lengths in rows of every level of the pyramid of dset"""
+    n = dset.shape[0]
+    out = [1 << base_level]
+    while -(-n // out[-1]) > min_blocks:
+        out.append(out[-1] * 2)
+    return out
+
+
+# %% Sidecar store
+
+# read-only sidecar handles keyed by filename, with the (dev, inode) they were opened at
+_sidecars = {}
+_lock = threading.Lock()
+
+
+def sidecar_dir(fname):
+    """<series>.pyramid directory next to a series file, one sidecar per dataset"""
+    return os.path.splitext(fname)[0] + ".pyramid"
+
+
+def sidecar_name(fname, name):
+    """Sidecar of the dataset name (its path in fname), mirroring that path"""
+    return os.path.join(sidecar_dir(fname), *name.strip("/").split("/")) + ".hdf5"
+
+
+def _ident(name):
+    try:
+        st = os.stat(name)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _sidecar(name):
+    # read-only handle on the sidecar file name, None if there is none
+    ident = _ident(name)
+    with _lock:
+        held = _sidecars.get(name)
+        if held is not None and held[0] == ident and held[1].id.valid:
+            return held[1]
+        _sidecars.pop(name, None)
+        if ident is None:
+            return None
+        # sidecars are only ever replaced whole, never written in place, so
+        # readers need no HDF5 file lock and never block each other or a build
+        f = h5py.File(name, "r", locking=False)
+        _sidecars[name] = (ident, f)
+        return f
+
+
+def discard(fname):
+    """Drop the handles on the sidecars of fname, e.g. once they have been removed"""
+    prefix = sidecar_dir(fname) + os.sep
+    with _lock:
+        for name in [n for n in _sidecars if n.startswith(prefix)]:
+            del _sidecars[name]
+
+
+def _stamp(fname):
+    st = os.stat(fname)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _built(name, stamp):
+    side = _sidecar(name)
+    if side is None or not np.array_equal(side.attrs.get("source", ()), stamp):
+        return None  # missing, or the source file changed since
+    return side
+
+
+def _write(out, h5, stamp, readahead):
+    # compute the pyramid of h5 into the (new) sidecar file out
+    n = h5.shape[0]
+    blocks = levels(h5)
+    dtype = _envelope_dtype(h5)
+    rows = block_rows(h5, blocks[0])
+    rows = max(blocks[0], rows // blocks[0] * blocks[0])
+    lo, hi, mean = [], [], []
+    for block in iter_blocks(h5, rows, readahead=readahead):
+        x = np.abs(block) if np.iscomplexobj(block) else block
+        for part_list, part in zip((lo, hi, mean), _reduce(x, blocks[0])):
+            part_list.append(part.astype(dtype, copy=False))
+    lo, hi, mean = (np.concatenate(p) for p in (lo, hi, mean))
+    for k, block in enumerate(blocks):
+        if k:
+            lo, hi, mean = _combine(lo, hi, mean, _counts(n, blocks[k - 1]))
+        out.create_dataset(str(k), data=np.stack([lo, hi, mean], axis=1))
+    out.attrs["blocks"] = blocks
+    out.attrs["rows"] = n
+    out.attrs["source"] = stamp
+
+
+def build(dset, readahead=2):
+    """Build (or reuse) the min/max/mean pyramid of a dataset in its sidecar.
+
+    Level 0 summarises blocks of 2**base_level rows and each level above
+    halves the resolution until at most min_blocks remain. The raw data is
+    streamed once in chunk aligned blocks; higher levels come from the level
+    below. Each level is stored as an (n_blocks, 3, ...) dataset of min, max
+    and mean. Every dataset has its own sidecar file, so building one never
+    touches the others. Builds take a lock file in the sidecar directory and
+    write a new sidecar that is renamed into place, so any number of
+    processes can read pyramids while one is being built. Returns the
+    (read-only) sidecar file.
+    """
+    h5 = getattr(dset, "h5", dset)
+    fname = h5.file.filename
+    stamp = _stamp(fname)
+    name = sidecar_name(fname, h5.name)
+    side = _built(name, stamp)
+    if side is not None:
+        return side
+    import hawk_disk
+
+    os.makedirs(os.path.dirname(name), exist_ok=True)
+    with hawk_disk.file_lock(os.path.join(sidecar_dir(fname), "build.lock")):
+        side = _built(name, stamp)  # another process may have built it meanwhile
+        if side is not None:
+            return side
+        tmp = f"{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with h5py.File(tmp, "w") as out:
+                _write(out, h5, stamp, readahead)
+            os.replace(tmp, name)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return _sidecar(name)
+
+
+def build_pyramids(obj, pattern=("acc", "frf")):
+    """Build the pyramids of every dataset below obj whose name is in pattern.
+
+    Up to date pyramids are skipped, so an interrupted run picks up where it
+    stopped. Returns the number of datasets visited.
+    """
+    h5 = getattr(obj, "h5", obj)
+    found = []
+
+    def visit(name, o):
+        if isinstance(o, h5py.Dataset) and name.split("/")[-1] in pattern:
+            found.append(o)
+
+    if isinstance(h5, h5py.Dataset):
+        found.append(h5)
+    else:
+        h5.visititems(visit)
+    for d in found:
+        build(d)
+    return len(found)
+
+
+def _envelope(h5, i0, i1, b):
+    # (min, max, mean) of blocks i0 to i1 of b rows, streamed from the raw data
+    n = h5.shape[0]
+    rows = max(b, block_rows(h5, b) // b * b)
+    dtype = _envelope_dtype(h5)
+    parts = []
+    for start in range(i0 * b, min(i1 * b, n), rows):
+        x = h5[start : min(start + rows, i1 * b, n)]
+        x = np.abs(x) if np.iscomplexobj(x) else x
+        parts.append([p.astype(dtype, copy=False) for p in _reduce(x, b)])
+    return [np.concatenate(p) for p in zip(*parts)]
+
+
+# %% API
+
+
+def overview(dset, t0=None, t1=None, max_points=2000, axis=None):
+    """Envelope of dset between t0 and t1 with at most about max_points blocks.
+
+    t0 and t1 are row indices, or values of axis (e.g. the NI time or LMS
+    frequency axis) when one is given. The coarsest pyramid level with enough
+    resolution is read, so the I/O per call is bounded by max_points whatever
+    the span; the first and last block may extend slightly beyond it. Spans
+    of at most max_points rows are read raw. If the pyramid can't be built
+    (e.g. the data_dir is read-only) the same envelope is computed from the
+    raw data in one streaming pass instead. Returns Overview(x, min, max,
+    mean, step): x holds the first row (or axis value) of each block and step
+    the rows per block. Complex data is summarised by its magnitude.
+    """
+    h5 = getattr(dset, "h5", dset)
+    n = h5.shape[0]
+    if axis is not None:
+        axis = np.asarray(axis)
+        r0 = 0 if t0 is None else int(np.searchsorted(axis, t0, "left"))
+        r1 = n if t1 is None else int(np.searchsorted(axis, t1, "right"))
+    else:
+        r0 = 0 if t0 is None else int(t0)
+        r1 = n if t1 is None else int(t1)
+    r0, r1 = max(r0, 0), min(r1, n)
+    if r1 - r0 <= max_points:
+        x = dset[r0:r1]
+        x = np.abs(x) if np.iscomplexobj(x) else x
+        idx = np.arange(r0, r1)
+        return Overview(idx if axis is None else axis[idx], x, x, x, 1)
+    blocks = levels(h5)
+    k = next(
+        (i for i, b in enumerate(blocks) if -(-(r1 - r0) // b) <= max_points),
+        len(blocks) - 1,
+    )
+    b = blocks[k]
+    i0, i1 = r0 // b, -(-r1 // b)
+    try:
+        env = build(h5)[str(k)][i0:i1]
+        lo, hi, mean = env[:, 0], env[:, 1], env[:, 2]
+    except OSError as err:
+        warnings.warn(f"no pyramid for {h5.name} ({err}), reading it raw")
+        lo, hi, mean = _envelope(h5, i0, i1, b)
+    idx = np.arange(i0, i1) * b
+    return Overview(idx if axis is None else axis[idx], lo, hi, mean, b)
@@ -0,0 +1,226 @@
+import hashlib
+import heapq
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# %% Keys and sizes
+
+
+def _path_key(idx, path):
+    # LUT key of the series file a header relative path lives in, from the path index
+    parts = path.strip("/").split("/")
+    for i in range(len(parts), 0, -1):
+        e = idx.get("/".join(parts[:i]))
+        if e is not None:
+            return os.path.splitext(os.path.basename(e["file"]))[0]
+    raise KeyError(f"{path} is not in the index")
+
+
+def _keys(selection, data):
+    # (kind, items, LUT key of each item) of a selection
+    import hawk
+
+    if hasattr(selection, "iloc"):
+        if {"testID", "testNumber"} <= set(selection.columns):
+            # FST tests (get_FST_metadata) or datasets (select)
+            keys = (
+                selection["testID"]
+                + "_"
+                + selection["testNumber"].astype(str).str.zfill(2)
+            )
+            return "frame", selection, list(keys)
+        if data is None:
+            raise ValueError("data is needed to shard a dataframe of paths")
+        idx = hawk.index(data)
+        return "frame", selection, [_path_key(idx, p) for p in selection["path"]]
+    if isinstance(selection, str):
+        selection = [selection]
+    items, keys = [], []
+    for s in selection:
+        if "/" in s:
+            if data is None:
+                raise ValueError("data is needed to shard dataset paths")
+            items.append(s)
+            keys.append(_path_key(hawk.index(data), s))
+        else:
+            found = hawk.resolve_keys(s)
+            items.extend(found)
+            keys.extend(found)
+    return "list", items, keys
+
+
+def series_sizes(keys, sizes=None):
+    """Weight of each series file: sizes[key] (bytes) if sizes are given, else 1.
+
+    Only explicit sizes are used, never what happens to be downloaded, so every
+    node weighs the series the same way. Without sizes the split is by count.
+    """
+    if sizes is None:
+        return {k: 1 for k in keys}
+    missing = [k for k in keys if k not in sizes]
+    if missing:
+        raise KeyError(f"no size given for {', '.join(missing[:5])}")
+    return {k: int(sizes[k]) for k in keys}
+
+
+# %% Shards
+
+
+ShardResult = namedtuple("ShardResult", ["plan", "index", "value"])
+
+
+class Shard:
+    """One part of a sharded selection.
+
+    selection holds the part of the original selection (rows of a dataframe,
+    or paths / keys) whose series files are keys; positions are their
+    positions in the original selection and weight the summed series weights.
+    plan fingerprints the whole split (selection, sizes and n_shards).
+    """
+
+    def __init__(self, index, n_shards, keys, weight, selection, positions, plan):
+        self.index = index
+        self.n_shards = n_shards
+        self.keys = keys
+        self.weight = weight
+        self.selection = selection
+        self.positions = positions
+        self.plan = plan
+
+    def result(self, value):
+        """Tag a node's result with this shard so merge_shards can check it"""
+        return ShardResult(self.plan, self.index, value)
+
+    def prefetch(self, data_dir="./hawk_data", workers=4, verbose=True):
+        """Download only the series files of this shard"""
+        import hawk
+
+        return hawk.prefetch(self.keys, data_dir, workers, verbose)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __repr__(self):
+        return (
+            f"<Shard {self.index}/{self.n_shards}: {len(self.keys)} series, "
+            f"{len(self)} items, weight {self.weight}>"
+        )
+
+
+def shards(selection, n_shards, data=None, sizes=None):
+    """Split a selection into n_shards parts of about equal size, by series file.
+
+    selection is a select() or get_FST_metadata() dataframe, header relative
+    dataset paths (needs data) or LUT keys and globs (e.g. 'BR_AR_*'). Every
+    series file goes to exactly one shard, heaviest first onto the lightest
+    shard, ties broken by key. Series are weighed by sizes (a {key: bytes}
+    mapping every node is given) or else counted, so the split only depends
+    on the arguments and every node of an array job computes the same shards.
+    Returns a list of Shard; node i works on shards(...)[i].selection after
+    its .prefetch() and returns shard.result(value) for merge_shards.
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+    kind, items, keys = _keys(selection, data)
+    unique = sorted(set(keys))
+    size = series_sizes(unique, sizes)
+    plan = json.dumps([n_shards, keys, [size[k] for k in unique]])
+    plan = hashlib.sha1(plan.encode()).hexdigest()[:16]
+    heap = [(0, i) for i in range(n_shards)]
+    owner = {}
+    for k in sorted(unique, key=lambda k: (-size[k], k)):
+        load, i = heapq.heappop(heap)
+        owner[k] = i
+        heapq.heappush(heap, (load + size[k], i))
+    out = []
+    for i in range(n_shards):
+        mine = [k for k in unique if owner[k] == i]
+        positions = [p for p, k in enumerate(keys) if owner[k] == i]
+        part = (
+            items.iloc[positions] if kind == "frame" else [items[p] for p in positions]
+        )
+        weight = sum(size[k] for k in mine)
+        out.append(Shard(i, n_shards, mine, weight, part, positions, plan))
+    return out
+
+
+# %% Merging
+
+
+def _pad_concat(arrays, axis, fill_value):
+    # concatenate along axis, padding the other axes to the largest shape
+    shape = np.max([a.shape for a in arrays], axis=0)
+    out = []
+    for a in arrays:
+        pad = [(0, 0 if d == axis else shape[d] - a.shape[d]) for d in range(a.ndim)]
+        if any(p[1] for p in pad):
+            a = np.pad(
+                a.astype(np.result_type(a, fill_value)), pad, constant_values=fill_value
+            )
+        out.append(a)
+    return np.concatenate(out, axis)
+
+
+def merge_shards(shards, results, axis=2, fill_value=np.nan):
+    """Merge per-shard results into the result for the whole selection.
+
+    results are the values returned by shard.result() on each node, in any
+    order; a result from a different split (other selection, sizes or
+    n_shards) raises ValueError. Plain values are taken to be in shard order
+    and can't be checked. Arrays are concatenated along axis (2, the tests
+    axis of stack and slice_from_dfs, by default), padding ragged shards with
+    fill_value.
+    Dataframes and lists are concatenated. Where a result has one entry per
+    item of its shard, entries are put back in the order of the original
+    selection. Export manifests ({'format', 'done'}) and other dicts are
+    combined. Tuples (e.g. slice_from_dfs with return_lengths) are merged
+    element by element, with axis a tuple of one axis per element.
+    """
+    results = list(results)
+    if len(results) != len(shards):
+        raise ValueError(f"{len(results)} results for {len(shards)} shards")
+    if len({s.plan for s in shards}) > 1:
+        raise ValueError("shards come from different splits")
+    if any(isinstance(r, ShardResult) for r in results):
+        by_index = {}
+        for r in results:
+            if not isinstance(r, ShardResult) or r.plan != shards[0].plan:
+                raise ValueError(
+                    "result does not come from this split of the selection"
+                )
+            by_index[r.index] = r.value
+        if sorted(by_index) != [s.index for s in shards]:
+            raise ValueError("results do not cover every shard exactly once")
+        results = [by_index[s.index] for s in shards]
+    first = results[0]
+    if isinstance(first, tuple):
+        axes = axis if isinstance(axis, tuple) else (axis,) * len(first)
+        return tuple(
+            merge_shards(shards, parts, ax, fill_value)
+            for parts, ax in zip(zip(*results), axes)
+        )
+    if isinstance(first, dict):
+        if {"format", "done"} <= set(first):
+            out = {"format": first["format"], "done": {}}
+            for r in results:
+                out["done"].update(r["done"])
+            return out
+        out = {}
+        for r in results:
+            out.update(r)
+        return out
+    positions = np.concatenate([np.asarray(s.positions, dtype=int) for s in shards])
+    order = np.argsort(positions, kind="stable")
+    if hasattr(first, "iloc"):
+        import pandas as pd
+
+        out = pd.concat(results)
+        return out.iloc[order] if len(out) == len(order) else out
+    if isinstance(first, np.ndarray):
+        out = _pad_concat(results, axis, fill_value)
+        return out.take(order, axis) if out.shape[axis] == len(order) else out
+    out = [x for r in results for x in r]
+    return [out[i] for i in order] if len(out) == len(order) else out
@@ -0,0 +1,208 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+# %% State
+
+# instrumentation is off by default; every hook is a single flag check until enabled
+on = False
+# cap on the number of spans kept for the trace export
+max_events = 1 << 20
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+_bytes = {}
+_events = []
+_t0 = time.perf_counter_ns()
+
+
+def reset():
+    """Clear all counters, timings and trace events"""
+    global _t0
+    with _lock:
+        _counters.clear()
+        _timings.clear()
+        _bytes.clear()
+        _events.clear()
+        _t0 = time.perf_counter_ns()
+
+
+# %% Recording
+
+
+def count(name, n=1):
+    """Add n to the counter name"""
+    if not on:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(name, start, stop):
+    dur = stop - start
+    # log2 histogram of the latency in microseconds
+    bucket = (dur // 1000).bit_length()
+    tid = threading.get_native_id()
+    with _lock:
+        t = _timings.get(name)
+        if t is None:
+            t = _timings[name] = {"count": 0, "total": 0, "min": dur, "max": dur}
+            t["hist"] = {}
+        t["count"] += 1
+        t["total"] += dur
+        t["min"] = min(t["min"], dur)
+        t["max"] = max(t["max"], dur)
+        t["hist"][bucket] = t["hist"].get(bucket, 0) + 1
+        if len(_events) < max_events:
+            _events.append((name, start - _t0, dur, tid))
+
+
+def timed(name):
+    """Decorator recording the latency of every call under name while enabled"""
+
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not on:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns())
+
+        return wrapper
+
+    return deco
+
+
+@contextlib.contextmanager
+def span(name):
+    """Record the latency of a with block under name while enabled"""
+    if not on:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter_ns())
+
+
+def add_bytes(dset, nbytes):
+    """Count nbytes read from the h5py dataset dset"""
+    if not on:
+        return
+    key = f"{os.path.basename(dset.file.filename)}:{dset.name}"
+    with _lock:
+        _bytes[key] = _bytes.get(key, 0) + nbytes
+        _counters["bytes_read"] = _counters.get("bytes_read", 0) + nbytes
+
+
+# %% API
+
+
+def enable():
+    """Start recording.
+
+    Bytes are counted for reads through hawk's datasets. Reads done by worker
+    processes (workers > 1) are not seen, only the time spent waiting for them.
+    """
+    global on
+    on = True
+
+
+def disable():
+    """Stop recording, the stats are kept"""
+    global on
+    on = False
+
+
+def _summary(t):
+    n = t["count"]
+    return {
+        "count": n,
+        "total_s": t["total"] / 1e9,
+        "mean_s": t["total"] / n / 1e9,
+        "min_s": t["min"] / 1e9,
+        "max_s": t["max"] / 1e9,
+        # upper edge of each log2 bucket in microseconds -> calls
+        "hist_us": {2**b: c for b, c in sorted(t["hist"].items())},
+    }
+
+
+def stats():
+    """Snapshot of everything recorded so far as plain (JSON serialisable) dicts.
+
+    counters holds event counts (lookups, cache hits and misses, downloads,
+    external file opens, bytes read and downloaded), timings the count, total,
+    mean, extremes and latency histogram of each instrumented call and
+    bytes_read the bytes read per '<file>:<dataset>'.
+    """
+    with _lock:
+        return {
+            "enabled": on,
+            "counters": dict(sorted(_counters.items())),
+            "timings": {k: _summary(v) for k, v in sorted(_timings.items())},
+            "bytes_read": dict(sorted(_bytes.items(), key=lambda kv: -kv[1])),
+        }
+
+
+def trace():
+    """The recorded spans in the Chrome trace event format (chrome://tracing, Perfetto)"""
+    pid = os.getpid()
+    with _lock:
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": start / 1e3,
+                "dur": dur / 1e3,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, dur, tid in _events
+        ]
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": stats()}
+
+
+def export(fname, fmt="json"):
+    """Write stats() ('json') or the profiler timeline ('trace') to fname"""
+    if fmt == "json":
+        out = stats()
+    elif fmt == "trace":
+        out = trace()
+    else:
+        raise ValueError(f"unknown format {fmt!r}, expected 'json' or 'trace'")
+    with open(fname, "w") as f:
+        json.dump(out, f, indent=1)
+    return fname
+
+
+@contextlib.contextmanager
+def instrument(stats_file=None, trace_file=None):
+    """Record everything done inside the with block.
+
+    Yields a dict that is filled with the stats() snapshot on exit. If
+    stats_file or trace_file are given, the stats or the trace timeline are
+    written there (see export). Recording is reset on entry and switched back
+    off on exit unless it was already enabled.
+    """
+    was_on = on
+    reset()
+    enable()
+    out = {}
+    try:
+        yield out
+    finally:
+        if not was_on:
+            disable()
+        out.update(stats())
+        if stats_file is not None:
+            export(stats_file, "json")
+        if trace_file is not None:
+            export(trace_file, "trace")
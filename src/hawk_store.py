@@ -0,0 +1,139 @@
+import os
+
+import h5py
+import numpy as np
+
+# %% Chunking
+
+# target size of a single chunk in the consolidated store
+chunk_bytes = 1 << 20
+
+
+def auto_chunks(shape, dtype):
+    """One repeat (column) of a (points, repeats) dataset per chunk, capped at chunk_bytes.
+
+    This makes the common frf[:, i] access a read of a single chunk while
+    whole-dataset reads stay sequential within the store.
+    """
+    if len(shape) == 0 or 0 in shape:
+        return None
+    rows = max(1, min(shape[0], chunk_bytes // np.dtype(dtype).itemsize))
+    return (rows,) + (1,) * (len(shape) - 1)
+
+
+def _chunks_for(d, chunks):
+    if chunks == "auto":
+        return auto_chunks(d.shape, d.dtype)
+    if chunks is None or chunks is True:
+        return chunks
+    return tuple(min(c, n) for c, n in zip(chunks, d.shape))
+
+
+# %% Copying
+
+
+def _copy_attrs(src, dst, attrs=None):
+    for k, v in (src.attrs if attrs is None else attrs).items():
+        dst.attrs[k] = v
+
+
+def _copy_dataset(src, dst_group, name, chunks, compression, compression_opts):
+    c = _chunks_for(src, chunks) if src.shape else None
+    kwargs = {}
+    if c is not None and compression is not None:
+        kwargs = {"compression": compression, "compression_opts": compression_opts}
+    dst = dst_group.create_dataset(
+        name, shape=src.shape, dtype=src.dtype, chunks=c, **kwargs
+    )
+    if src.shape and src.shape[0]:
+        # copy in blocks of whole chunks so memory stays bounded for long histories
+        row_bytes = src.dtype.itemsize * int(np.prod(src.shape[1:]))
+        step = max(1, (64 << 20) // max(row_bytes, 1))
+        if c is not None:
+            step = max(c[0], step // c[0] * c[0])
+        for start in range(0, src.shape[0], step):
+            dst[start : start + step] = src[start : start + step]
+    elif not src.shape:
+        dst[()] = src[()]
+    _copy_attrs(src, dst)
+
+
+def _copy_tree(src, dst, **opts):
+    for k in src.keys():
+        o = src.get(k)
+        if isinstance(o, h5py.Dataset):
+            _copy_dataset(o, dst, k, **opts)
+        else:
+            g = dst.create_group(k)
+            _copy_attrs(o, g)
+            _copy_tree(o, g, **opts)
+
+
+# %% API
+
+
+def consolidate(
+    data_dir="./hawk_data",
+    out=None,
+    campaign="SBW",
+    chunks="auto",
+    compression=None,
+    compression_opts=None,
+):
+    """Repack the header and all downloaded series of a campaign into one HDF5 store.
+
+    The store keeps the header path layout, so SBW()/FST() open it in place of
+    the header when it sits at the default location <data_dir>/<campaign>_store.hdf5.
+    Series that are not downloaded remain external links and are fetched on
+    access as before. The attrs of each series are copied including those it
+    inherited within its own file, so setup() still sees them (along with the
+    attrs of the header groups above it, which are now true ancestors).
+
+    chunks is 'auto' (see auto_chunks), None for contiguous storage, True for
+    h5py's guess or an explicit chunk shape. compression (e.g. 'gzip', 'lzf')
+    requires chunked storage.
+    """
+    import hawk
+
+    header = os.path.join(data_dir, f"{campaign}_header.hdf5")
+    hawk.get_data_if_missing(f"{campaign}_header", data_dir)
+    if out is None:
+        out = os.path.join(data_dir, f"{campaign}_store.hdf5")
+    out_dir = os.path.dirname(os.path.abspath(out))
+    opts = {
+        "chunks": chunks,
+        "compression": compression,
+        "compression_opts": compression_opts,
+    }
+    tmp = out + ".tmp"
+    with h5py.File(header, "r") as src, h5py.File(tmp, "w") as dst:
+        _copy_attrs(src, dst)
+
+        def walk(sg, dg):
+            for k in sg.keys():
+                link = sg.get(k, getlink=True)
+                if isinstance(link, h5py.ExternalLink):
+                    fname = os.path.join(data_dir, link.filename)
+                    if not os.path.isfile(fname):
+                        rel = os.path.relpath(os.path.abspath(fname), out_dir)
+                        dg[k] = h5py.ExternalLink(rel.replace(os.sep, "/"), link.path)
+                        continue
+                    with h5py.File(fname, "r") as series:
+                        target = hawk.hdf5_group_getter(series, link.path)
+                        g = dg.create_group(k)
+                        _copy_attrs(
+                            target, g, hawk.inherited_attrs(series, target.name)
+                        )
+                        _copy_tree(target, g, **opts)
+                    continue
+                o = hawk.hdf5_group_getter(sg, k)
+                if isinstance(o, h5py.Dataset):
+                    _copy_dataset(o, dg, k, **opts)
+                else:
+                    g = dg.create_group(k)
+                    _copy_attrs(o, g)
+                    walk(o, g)
+
+        walk(src, dst)
+    os.replace(tmp, out)
+    return out
@@ -0,0 +1,137 @@
+import queue
+import threading
+
+import numpy as np
+
+# %% Block reading
+
+# rough size of each block read from the file
+block_bytes = 8 << 20
+
+
+def block_rows(dset, window):
+    """Rows per read: a whole number of chunks, at least one window and ~block_bytes"""
+    row_bytes = dset.dtype.itemsize * int(np.prod(dset.shape[1:]))
+    rows = max(window, block_bytes // max(row_bytes, 1))
+    if dset.chunks is not None:
+        c = dset.chunks[0]
+        rows = -(-rows // c) * c
+    return min(rows, dset.shape[0])
+
+
+def _put(q, item, stop):
+    # q.put that gives up once the consumer has stopped; True if item was put
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _reader(dset, sel, rows, q, stop):
+    try:
+        for start in range(0, dset.shape[0], rows):
+            block = dset[(slice(start, start + rows), *sel)]
+            if not _put(q, block, stop):
+                return
+    except Exception as err:  # handed to the consumer to re-raise
+        _put(q, err, stop)
+        return
+    _put(q, None, stop)
+
+
+def iter_blocks(dset, rows, repeats=None, readahead=2):
+    """Yield consecutive row blocks of dset read ahead on a background thread.
+
+    Up to readahead blocks are buffered, so reading the next block overlaps
+    with whatever the consumer does with the current one.
+    """
+    sel = () if dset.ndim == 1 or repeats is None else (repeats,)
+    q = queue.Queue(maxsize=readahead)
+    stop = threading.Event()
+    t = threading.Thread(target=_reader, args=(dset, sel, rows, q, stop), daemon=True)
+    t.start()
+    try:
+        while True:
+            block = q.get()
+            if block is None:
+                return
+            if isinstance(block, Exception):
+                raise block
+            yield block
+    finally:
+        stop.set()
+
+
+# %% API
+
+
+def stream(dset, window, hop=None, repeats=None, func=None, readahead=2):
+    """Yield overlapping windows along the first (time) axis of a dataset.
+
+    Windows are window rows long and start every hop rows (default: window);
+    a trailing partial window is dropped. repeats selects columns of a
+    (time, repeats) dataset. The file is read in chunk aligned blocks on a
+    background thread (see iter_blocks) so memory use is independent of the
+    length of the dataset. If func is given it is applied to each window and
+    its result is yielded instead.
+    """
+    hop = window if hop is None else hop
+    if window <= 0 or hop <= 0:
+        raise ValueError("window and hop must be positive")
+    carry = None
+    skip = 0  # rows still to skip when hop > window
+    for block in iter_blocks(dset, block_rows(dset, window), repeats, readahead):
+        if skip:
+            n = min(skip, len(block))
+            block, skip = block[n:], skip - n
+            if not len(block):
+                continue
+        buf = block if carry is None else np.concatenate([carry, block])
+        pos = 0
+        while pos + window <= len(buf):
+            w = buf[pos : pos + window]
+            yield w if func is None else func(w)
+            pos += hop
+        if pos >= len(buf):
+            carry, skip = None, pos - len(buf)
+        else:
+            carry = buf[pos:].copy()
+
+
+def cpsd(dsets, nperseg, noverlap=None, fs=1.0, repeat=0):
+    """Welch estimate of the (freq, P, P) cross spectral density matrix of P datasets.
+
+    Streams one repeat of each (time, repeats) dataset in lockstep, so memory
+    use is set by nperseg rather than the record length. Matches the defaults
+    of scipy.signal.csd (periodic Hann window, constant detrend, density
+    scaling, one sided) and returns (f, Pxy) with Pxy[:, i, j] = csd(x_i, x_j).
+    Datasets shorter than nperseg raise ValueError.
+    """
+    noverlap = nperseg // 2 if noverlap is None else noverlap
+    hop = nperseg - noverlap
+    shortest = min(d.shape[0] for d in dsets)
+    if shortest < nperseg:
+        raise ValueError(
+            f"nperseg ({nperseg}) is longer than the shortest dataset ({shortest} rows)"
+        )
+    win = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+    scale = 1.0 / (fs * (win**2).sum())
+    out = 0
+    n = 0
+    streams = [
+        stream(d, nperseg, hop, repeats=None if d.ndim == 1 else repeat) for d in dsets
+    ]
+    for segs in zip(*streams):
+        x = np.stack(segs, axis=-1)
+        x = (x - x.mean(0)) * win[:, None]
+        X = np.fft.rfft(x, axis=0)
+        out = out + X.conj()[:, :, None] * X[:, None, :]
+        n += 1
+    Pxy = out * scale / max(n, 1)
+    Pxy[1:] *= 2
+    if nperseg % 2 == 0:
+        Pxy[-1] /= 2
+    return np.fft.rfftfreq(nperseg, 1 / fs), Pxy
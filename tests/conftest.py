@@ -0,0 +1,45 @@
+import os
+
+import h5py
+import pytest
+
+import hawk
+from benchmarks import hawk_synth
+
+SENSORS = ["FRC", "EXH", "ULC-03"]
+
+
+@pytest.fixture(scope="module")
+def sbw(tmp_path_factory):
+    """Synthetic SBW campaign (BR_AR_01 to 03) served by the download stand-in"""
+    root = str(tmp_path_factory.mktemp("sbw"))
+    lut = hawk_synth.make_sbw(root, "BR_AR_0[1-3]", SENSORS, n_freq=201, n_time=2048)
+    with hawk_synth.stand_in(root, lut):
+        yield root
+
+
+@pytest.fixture(scope="module")
+def fst(tmp_path_factory):
+    """Synthetic FST campaign with ragged repeats (HS_WN_03 has 2), opened from disk"""
+    root = str(tmp_path_factory.mktemp("fst"))
+    lut = hawk_synth.make_fst(root, "HS_WN_0[1-3]", n_time=1024, n_repeats=3)
+    fname = os.path.join(root, "HS_WN_03.hdf5")
+    with h5py.File(fname, "a") as f:
+        for sensor in hawk_synth.FST_SENSORS:
+            acc = f[f"{sensor}/acc"]
+            data, attrs = acc[:, :2], dict(acc.attrs)
+            del f[f"{sensor}/acc"]
+            f[f"{sensor}/acc"] = data
+            f[f"{sensor}/acc"].attrs.update(attrs)
+    lut["HS_WN_03"]["md5"] = hawk_synth._md5(fname)
+    hawk.lut.update(lut)
+    data = hawk.FST(root)
+    yield data
+    data.close()
+
+
+def counters(func):
+    """(func(), the hawk_stats counters recorded while it ran)"""
+    with hawk.instrument() as stats:
+        out = func()
+    return out, stats["counters"]
@@ -0,0 +1,37 @@
+import asyncio
+
+import numpy as np
+
+import hawk
+from conftest import counters
+
+# %% Async API
+
+
+def test_async_downloads_are_single_flight(sbw, tmp_path):
+    async def main():
+        fetch = hawk.aget_data_if_missing
+        return await asyncio.gather(
+            *[fetch("BR_AR_03", str(tmp_path)) for _ in range(5)]
+        )
+
+    done, stats = counters(lambda: asyncio.run(main()))
+    assert done == ["BR_AR_03"] * 5
+    assert stats["downloads"] == 1
+    assert asyncio.run(hawk.aget_data_if_missing("BR_AR_03", str(tmp_path))) is None
+
+
+def test_async_open_get_and_read_match_sync(sbw, tmp_path):
+    async def main():
+        data = await hawk.aopen_sbw(str(tmp_path))
+        frf = await data.aget("LMS/BR_AR/02/EXH/frf")
+        return data, await frf.aread(np.s_[:, 0])
+
+    data, x = asyncio.run(main())
+    try:
+        np.testing.assert_array_equal(x, data["LMS/BR_AR/02/EXH/frf"][:, 0])
+        assert asyncio.run(hawk.aprefetch("BR_AR_0[1-2]", str(tmp_path))) == [
+            "BR_AR_01"
+        ]
+    finally:
+        data.close()
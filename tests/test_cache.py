@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import hawk
+import hawk_cache
+
+# %% Memoised calls
+
+
+def test_cache_hits_misses_and_return_types(fst, tmp_path):
+    calls = []
+
+    @hawk.cache(directory=str(tmp_path))
+    def summary(dset, kind):
+        calls.append(kind)
+        x = dset[:]
+        if kind == "array":
+            return x.mean(0)
+        if kind == "tuple":
+            return x.min(0), x.max(0), np.float64(x.std())
+        if kind == "dict":
+            return {"min": x.min(0), "max": x.max(0)}
+        return {"rows": int(x.shape[0]), "peak": float(x.max()), "units": ["g"]}
+
+    dset = fst["HS_WN/01/SW_LC1/acc"]
+    for kind in ["array", "tuple", "dict", "json"]:
+        first = summary(dset, kind)
+        again = summary(dset, kind)
+        assert type(again) is type(first)
+        np.testing.assert_equal(again, first)
+    assert isinstance(summary(dset, "tuple")[2], np.float64)
+    assert calls == ["array", "tuple", "dict", "json"]
+    store = summary.store(dset, "array")
+    assert store.info()["entries"] == 4
+    assert (store.hits, store.misses) == (5, 4)
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob("*.pkl"))
+
+
+def test_cache_rejects_values_without_a_safe_format(tmp_path):
+    bad = {
+        "object": object(),
+        "tuple of floats": (1.0, 2.0),
+        "int keys": {1: np.zeros(2)},
+        "object array": np.array([None, 1]),
+    }
+
+    @hawk.cache(directory=str(tmp_path))
+    def result(name):
+        return bad[name]
+
+    for name in bad:
+        with pytest.raises(TypeError):
+            result(name)
+    with pytest.raises(TypeError):
+        result(object())  # no stable key either
+    assert not list(tmp_path.iterdir())
+
+
+def test_cache_recomputes_when_the_source_changes(sbw, tmp_path):
+    calls = []
+
+    @hawk.cache(directory=str(tmp_path / "derived"))
+    def peak(dset):
+        calls.append(1)
+        return dset[:].max(0)
+
+    with hawk.SBW(str(tmp_path)) as data:
+        frf = data["LMS/BR_AR/01/EXH/frf"]
+        peak(frf)
+        peak(frf)
+        fname = str(tmp_path / "BR_AR_01.hdf5")
+        st = os.stat(fname)
+        os.utime(fname, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        peak(frf)
+    assert len(calls) == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    store = hawk_cache.Store(str(tmp_path), max_bytes=3000)
+    for i, key in enumerate("abc"):
+        store.put(key, np.zeros(100))  # 928 bytes each with the header
+        os.utime(store._paths(key)[1]["npy"], ns=(0, i * 10**9))
+    store.get("a")  # now the most recently used
+    store.put("d", np.zeros(100))
+    assert sorted(e[0] for e in store.entries()) == ["a", "c", "d"]
+    assert store.get("b") == (False, None)
+
+
+def test_cache_keys_ignore_the_hash_seed():
+    code = (
+        "import hawk_cache\n"
+        "f = lambda x: x in {'a', 'b', 'c'}\n"
+        "print(hawk_cache.make_key(f, ({'x', 'y', 'z'}, frozenset('abc')), {})[0])"
+    )
+    keys = set()
+    for seed in ["1", "2", "3"]:
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        out = subprocess.run(
+            [sys.executable, "-c", code], env=env, capture_output=True, text=True
+        )
+        assert out.returncode == 0, out.stderr
+        keys.add(out.stdout)
+    assert len(keys) == 1
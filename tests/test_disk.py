@@ -0,0 +1,120 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import hawk
+import hawk_disk
+from conftest import counters
+
+SERIES = ["BR_AR_01", "BR_AR_02", "BR_AR_03"]
+
+
+@pytest.fixture
+def data_dir(sbw, tmp_path):
+    """A data_dir holding the header and BR_AR_01 to 03, last used 02, 01, 03"""
+    d = str(tmp_path / "data")
+    hawk.get_data_if_missing("SBW_header", d)
+    hawk.prefetch("BR_AR_0[1-3]", d, verbose=False)
+    for atime, key in enumerate(["BR_AR_02", "BR_AR_01", "BR_AR_03"], 1):
+        fname = os.path.join(d, key + ".hdf5")
+        os.utime(fname, ns=(atime * 10**9, os.stat(fname).st_mtime_ns))
+    return d
+
+
+def _size(data_dir, key):
+    return os.path.getsize(os.path.join(data_dir, key + ".hdf5"))
+
+
+def _downloaded(data_dir):
+    return sorted(k for k, _, _ in hawk_disk.series_files(data_dir))
+
+
+# %% Eviction
+
+
+def test_make_room_evicts_least_recently_used_first(data_dir):
+    used = hawk_disk.disk_used(data_dir)
+    room = _size(data_dir, "BR_AR_02") + 1
+    assert hawk_disk.make_room(data_dir, room, budget=used) == ["BR_AR_02", "BR_AR_01"]
+    assert _downloaded(data_dir) == ["BR_AR_03"]
+    assert os.path.isfile(os.path.join(data_dir, "SBW_header.hdf5"))
+    assert not os.path.exists(os.path.join(data_dir, "BR_AR_02.hdf5.stamp"))
+
+
+def test_pinned_and_kept_series_are_never_evicted(data_dir):
+    assert hawk.pin("BR_AR_02", data_dir) == {"BR_AR_02"}
+    evicted = hawk_disk.make_room(data_dir, keep=["BR_AR_03"], budget=0)
+    assert evicted == ["BR_AR_01"]
+    assert _downloaded(data_dir) == ["BR_AR_02", "BR_AR_03"]
+    assert hawk.unpin("BR_AR_*", data_dir) == set()
+    assert hawk_disk.make_room(data_dir, budget=0) == ["BR_AR_02", "BR_AR_03"]
+
+
+def test_downloads_stay_within_the_budget(sbw, tmp_path, monkeypatch):
+    d = str(tmp_path)
+    hawk.get_data_if_missing("SBW_header", d)
+    hawk.prefetch("BR_AR_01", d, verbose=False)
+    budget = hawk_disk.disk_used(d) + _size(d, "BR_AR_01")  # room for one more
+    monkeypatch.setattr(hawk_disk, "max_bytes", budget)
+    for key in ["BR_AR_02", "BR_AR_03"]:
+        hawk.prefetch(key, d, verbose=False)
+        assert hawk_disk.disk_used(d) <= budget
+    assert _downloaded(d) == ["BR_AR_02", "BR_AR_03"]
+    assert not [n for n in os.listdir(d) if n.endswith((".hdf5.lock", ".reserved"))]
+
+
+def test_disk_used_counts_series_files_only(data_dir):
+    used = hawk_disk.disk_used(data_dir)
+    assert used == sum(_size(data_dir, k) for k in SERIES + ["SBW_header"])
+    for name in ["BR_AR_01.pyramid.hdf5", "BR_AR_01.hdf5.lock", "notes.hdf5"]:
+        with open(os.path.join(data_dir, name), "wb") as f:
+            f.write(b"x" * 1000)
+    with hawk.SBW(data_dir) as data:
+        data["LMS/BR_AR/01/EXH/frf"].overview(max_points=10)  # builds a sidecar
+    assert os.path.isdir(os.path.join(data_dir, "BR_AR_01.pyramid"))
+    assert hawk_disk.disk_used(data_dir) == used
+    hawk_disk.make_room(data_dir, keep=["BR_AR_02", "BR_AR_03"], budget=0)
+    assert not os.path.exists(os.path.join(data_dir, "BR_AR_01.pyramid"))
+
+
+def test_cache_info_reports_use_of_the_data_dir(data_dir):
+    hawk.pin("BR_AR_03", data_dir)
+    freed = _size(data_dir, "BR_AR_01") + _size(data_dir, "BR_AR_02")
+    before = hawk.cache_info(data_dir)
+    assert before["files"] == 3 and before["pinned"] == ["BR_AR_03"]
+    assert before["bytes"] == hawk_disk.disk_used(data_dir)
+    hawk_disk.make_room(data_dir, budget=0)
+    after = hawk.cache_info(data_dir)
+    assert after["evictions"] == before["evictions"] + 2
+    assert after["files"] == 1
+    assert after["bytes"] == before["bytes"] - freed
+
+
+def test_eviction_invalidates_the_index(data_dir, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = "LMS/BR_AR/01/EXH/frf"
+    with hawk.SBW(data_dir) as data:
+        before = data[path][:]
+        hawk.index(data)
+        hawk_disk.make_room(data_dir, keep=["BR_AR_02", "BR_AR_03"], budget=0)
+        fname, _ = hawk.resolve(data, path)  # downloads the series again
+        assert os.path.isfile(fname)
+        assert (data[path][:] == before).all()
+        hawk.index(data)
+        hawk_disk.make_room(data_dir, keep=["BR_AR_02", "BR_AR_03"], budget=0)
+        manifest = hawk.export(data, [path], out=str(tmp_path / "out"))
+        assert list(manifest["done"]) == [path]
+
+
+def test_concurrent_fetches_share_one_download_and_lock(sbw, tmp_path):
+    def fetch_all():
+        with ThreadPoolExecutor(8) as pool:
+            return set(
+                pool.map(lambda _: hawk.fetch("BR_AR_01", str(tmp_path)), range(8))
+            )
+
+    done, stats = counters(fetch_all)
+    assert done == {str(tmp_path / "BR_AR_01.hdf5")}
+    assert stats["downloads"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["BR_AR_01.hdf5", "BR_AR_01.hdf5.stamp"]
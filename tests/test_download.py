@@ -0,0 +1,75 @@
+import os
+import shutil
+
+import pytest
+
+import hawk
+from conftest import counters
+
+# %% Prefetch
+
+
+def test_prefetch_downloads_every_match(sbw, tmp_path):
+    done, stats = counters(
+        lambda: hawk.prefetch("BR_AR_0[1-3]", str(tmp_path), workers=3, verbose=False)
+    )
+    assert sorted(done) == ["BR_AR_01", "BR_AR_02", "BR_AR_03"]
+    assert stats["downloads"] == 3
+    for key in done:
+        assert hawk.verify(key, str(tmp_path))
+    assert hawk.prefetch("BR_AR_0[1-3]", str(tmp_path), verbose=False) == []
+
+
+def test_prefetch_resumes_part(sbw, tmp_path):
+    src = os.path.join(sbw, "BR_AR_01.hdf5")
+    size = os.path.getsize(src)
+    with open(src, "rb") as f, open(tmp_path / "BR_AR_01.hdf5.part", "wb") as part:
+        part.write(f.read(size // 2))
+    done, stats = counters(
+        lambda: hawk.prefetch("BR_AR_01", str(tmp_path), verbose=False)
+    )
+    assert done == ["BR_AR_01"]
+    assert stats["bytes_downloaded"] == size - size // 2
+    assert hawk.file_md5(str(tmp_path / "BR_AR_01.hdf5")).hexdigest() == (
+        hawk.lut["BR_AR_01"]["md5"]
+    )
+    assert not os.path.exists(tmp_path / "BR_AR_01.hdf5.part")
+
+
+# %% Verification
+
+
+def test_prefetch_complete_part_416(sbw, tmp_path):
+    # a complete .part asks for a range past the end of the file, answered with 416
+    shutil.copy(os.path.join(sbw, "BR_AR_02.hdf5"), tmp_path / "BR_AR_02.hdf5.part")
+    done, stats = counters(
+        lambda: hawk.prefetch("BR_AR_02", str(tmp_path), verbose=False)
+    )
+    assert done == ["BR_AR_02"]
+    assert stats.get("bytes_downloaded", 0) == 0
+    assert hawk.read_stamp(str(tmp_path / "BR_AR_02.hdf5"))["md5"] == (
+        hawk.lut["BR_AR_02"]["md5"]
+    )
+
+
+def test_verify_uses_the_stamp_until_the_file_changes(sbw, tmp_path):
+    hawk.prefetch("BR_AR_03", str(tmp_path), verbose=False)
+    _, stats = counters(lambda: hawk.verify("BR_AR_03", str(tmp_path)))
+    assert stats == {"verify.stamp_hits": 1}
+    fname = tmp_path / "BR_AR_03.hdf5"
+    with open(fname, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(hawk.BadDownloadError):
+        hawk.verify("BR_AR_03", str(tmp_path))
+
+
+def test_corrupt_download_is_rejected(sbw, tmp_path, monkeypatch):
+    monkeypatch.setitem(hawk.lut, "BR_AR_01", dict(hawk.lut["BR_AR_01"], md5="0" * 32))
+    with pytest.raises(hawk.BadDownloadError):
+        hawk.fetch("BR_AR_01", str(tmp_path))
+    assert not os.path.exists(tmp_path / "BR_AR_01.hdf5")
+    assert not os.path.exists(tmp_path / "BR_AR_01.hdf5.part")
+    assert not os.path.exists(tmp_path / "BR_AR_01.hdf5.lock")
@@ -0,0 +1,81 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import hawk
+from conftest import counters
+
+pq = pytest.importorskip("pyarrow.parquet")
+zarr = pytest.importorskip("zarr")
+
+
+def _from_long(table, shape):
+    # dataset values back from the long form (row, repeat, value) columns
+    t = table.to_pandas().sort_values(["row", "repeat"])
+    return t["value"].to_numpy().reshape(shape)
+
+
+# %% Parquet
+
+
+def test_parquet_round_trip(fst, tmp_path):
+    sel = hawk.select(fst, tests="HS_WN/0[13]", sensors="SW_LC1", signal="acc")
+    out = str(tmp_path / "out")
+    manifest = hawk.export(fst, sel, "parquet", out=out, workers=2)
+    assert sorted(manifest["done"]) == ["HS_WN/01/SW_LC1/acc", "HS_WN/03/SW_LC1/acc"]
+    for path in manifest["done"]:
+        dset = fst[path]
+        table = pq.read_table(os.path.join(out, *path.split("/")) + ".parquet")
+        np.testing.assert_array_equal(_from_long(table, dset.shape), dset[:])
+        assert set(table.column("units").to_pylist()) == {dset.setup()["units"]}
+        assert set(table.column("description").to_pylist()) == {"synthetic HS_WN"}
+    import pyarrow.dataset as ds
+
+    assert ds.dataset(out).count_rows() == 1024 * 3 + 1024 * 2
+
+
+def test_export_resumes_from_the_manifest(fst, tmp_path):
+    paths = ["HS_WN/01/PW_LC1/acc", "HS_WN/02/PW_LC1/acc"]
+    out = str(tmp_path / "out")
+    hawk.export(fst, paths, "parquet", out=out)
+    files = [os.path.join(out, *p.split("/")) + ".parquet" for p in paths]
+    first = [os.stat(f).st_mtime_ns for f in files]
+    with open(out + ".manifest.json") as f:
+        manifest = json.load(f)
+    manifest["done"][paths[1]] = [0, 0]  # as if its source changed since
+    with open(out + ".manifest.json", "w") as f:
+        json.dump(manifest, f)
+    hawk.export(fst, paths, "parquet", out=out)
+    again = [os.stat(f).st_mtime_ns for f in files]
+    assert again[0] == first[0] and again[1] != first[1]
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+    with pytest.raises(ValueError):
+        hawk.export(fst, paths, "zarr", out=out)
+
+
+# %% Zarr
+
+
+def test_zarr_round_trip_downloads_in_the_tasks(sbw, tmp_path):
+    paths = [f"LMS/BR_AR/0{i}/EXH/frf" for i in (1, 2, 3)]
+    out = str(tmp_path / "out.zarr")
+    with hawk.SBW(str(tmp_path / "data")) as data:
+        manifest, stats = counters(lambda: hawk.export(data, paths, "zarr", out=out))
+        assert stats["downloads"] == 3
+        root = zarr.open_group(out, mode="r")
+        for path in manifest["done"]:
+            np.testing.assert_array_equal(root[path][:], data[path][:])
+            assert root[path].attrs["units"] == data[path].setup()["units"]
+        np.testing.assert_array_equal(
+            root["LMS/xData/freq"][:], data["LMS/xData/freq"][:]
+        )
+        # a series removed since the index was built is downloaded again
+        hawk.index(data)
+        os.remove(tmp_path / "data" / "BR_AR_02.hdf5")
+        del manifest["done"]["LMS/BR_AR/02/EXH/frf"]
+        with open(out + ".manifest.json", "w") as f:
+            json.dump(manifest, f)
+        again = hawk.export(data, paths, "zarr", out=out)
+        assert sorted(again["done"]) == paths
@@ -0,0 +1,36 @@
+import json
+
+import hawk
+
+# %% Path index
+
+
+def test_index_round_trips_through_json(fst):
+    idx = hawk.index(fst)
+    with open(fst.file.filename + ".index.json") as f:
+        json.load(f)
+    hawk._indexes.clear()
+    assert hawk.index(fst) == idx
+    e = idx["HS_WN/01/SW_LC1/acc"]
+    assert e["kind"] == "dataset" and e["shape"] == (1024, 3)
+    assert isinstance(e["attrs"]["units"], str)
+
+
+def test_index_follows_downloads(sbw, tmp_path):
+    data = hawk.SBW(str(tmp_path))
+    try:
+        idx = hawk.index(data)
+        assert idx["LMS/BR_AR/01"]["kind"] == "external"
+        assert "LMS/BR_AR/01/EXH/frf" not in idx
+        frf = data["LMS/BR_AR/01/EXH/frf"]
+        idx = hawk.index(data)
+        assert idx["LMS/BR_AR/01/EXH/frf"]["shape"] == frf.shape
+        assert hawk.resolve(data, "LMS/BR_AR/01/EXH/frf") == (
+            str(tmp_path / "BR_AR_01.hdf5"),
+            "/LMS/EXH/frf",
+        )
+        assert sorted(hawk.catalogue(data, "LMS/BR_AR/01/*/frf", kind="dataset")) == [
+            f"LMS/BR_AR/01/{s}/frf" for s in ["EXH", "FRC", "ULC-03"]
+        ]
+    finally:
+        data.close()
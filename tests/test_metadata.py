@@ -0,0 +1,47 @@
+import os
+
+import hawk
+from conftest import counters
+
+# %% FST metadata
+
+
+def test_select_matches_tests_sensors_and_signal(fst):
+    sel = hawk.select(fst, tests="HS_WN/0[12]", sensors="SW_*", signal="acc")
+    assert len(sel) == 2 * 4
+    assert set(sel["testNumber"]) == {1, 2}
+    assert set(sel["sensorID"]) == {"SW_LC1", "SW_LC7", "SW_UC1", "SW_UC7"}
+    row = sel.iloc[0]
+    assert row["path"] == f"HS_WN/01/{row['sensorID']}/acc"
+    assert row["shape"] == fst[row["path"]].shape
+    assert row["description"] == "synthetic HS_WN"
+    assert len(hawk.select(fst, tests="HS_*", sensors="PW_LC1")) == 3
+
+
+def test_read_table_caches_in_memory_and_as_json(fst):
+    fname = os.path.join(fst.data_dir, "Hawk_FST_test_meta.csv")
+    hawk._tables.clear()
+    table = hawk.read_table(fname)
+    assert os.path.isfile(fname + ".json")
+    again, stats = counters(lambda: hawk.read_table(fname))
+    assert stats == {"tables.hits": 1} and again.equals(table)
+    again.loc[0, "testID"] = "changed"  # copies are safe to modify
+    hawk._tables.clear()
+    assert hawk.read_table(fname).equals(table)  # from the JSON
+    with open(fname, "a") as f:
+        f.write("HS_WN,4,synthetic HS_WN\n")
+    assert len(hawk.read_table(fname)) == len(table) + 1
+
+
+def test_read_table_without_a_writable_directory(fst):
+    fname = os.path.join(fst.data_dir, "Hawk_FST_sensor_meta.csv")
+    for p in (fname + ".json", fname + f".json.{os.getpid()}.tmp"):
+        if os.path.isfile(p):
+            os.remove(p)
+    # a directory in the way makes the JSON write fail, even for root
+    os.mkdir(fname + f".json.{os.getpid()}.tmp")
+    hawk._tables.clear()
+    table = hawk.read_table(fname, skiprows=1)
+    assert list(table.columns) == ["sensorID", "signal", "location"]
+    assert not os.path.exists(fname + ".json")
+    os.rmdir(fname + f".json.{os.getpid()}.tmp")
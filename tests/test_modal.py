@@ -0,0 +1,34 @@
+import numpy as np
+
+from benchmarks import hawk_synth
+from hawk_modal import RFP, band, get_wns, rfp_batch
+
+# %% Rational fraction polynomial
+
+
+def test_rfp_batch_matches_rfp():
+    rng = np.random.default_rng(0)
+    w = np.linspace(20, 60, 120)
+    H = hawk_synth._frf(rng, len(w), 4).T
+    wns, zetas = rfp_batch(H, w, 3, oob_terms=1)
+    assert wns.shape == zetas.shape == (4, 3)
+    for h, wn, zeta in zip(H, wns, zetas):
+        _, wn_ref, zeta_ref = RFP(h, w, 3, oob_terms=1)
+        np.testing.assert_allclose(wn, wn_ref, rtol=1e-8)
+        np.testing.assert_allclose(zeta, zeta_ref, rtol=1e-6, atol=1e-12)
+
+
+def test_get_wns_fits_band_by_band():
+    rng = np.random.default_rng(1)
+    ws = np.linspace(0, 160, 801)
+    H = hawk_synth._frf(rng, len(ws), 3).T.reshape(1, 3, -1)
+    ranges = [((10, 40), 2), ((60, 90), 1)]
+    wns, zetas = get_wns(ranges, ws, H)
+    assert wns.shape == zetas.shape == (1, 3, 3)
+    for k, ((low, high), n) in enumerate(ranges):
+        idx = band(ws, low, high)
+        assert low < ws[idx][0] and ws[idx][-1] < high
+        cols = slice(0, 2) if k == 0 else slice(2, 3)
+        np.testing.assert_allclose(
+            wns[..., cols], rfp_batch(H[..., idx], ws[idx], n)[0], rtol=1e-12
+        )
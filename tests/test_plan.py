@@ -0,0 +1,47 @@
+import numpy as np
+
+import hawk
+import hawk_plan
+
+# %% Value based selection
+
+
+def test_axis_rows_selects_the_values_between(sbw, tmp_path):
+    with hawk.SBW(str(tmp_path)) as data:
+        freq = data["LMS/xData/freq"][:]
+        low, high = freq[20] + 0.01, freq[80]
+        rows = hawk.axis_rows(data, "LMS/BR_AR/01/EXH/frf", low, high)
+        assert rows == slice(21, 81)
+        assert rows == hawk.rows_between(freq, low, high)
+        assert len(freq[hawk.rows_between(freq, high, low)]) == 0
+        assert hawk.rows_between(freq) == slice(0, len(freq))
+
+
+# %% Planning
+
+
+def test_plan_coalesces_columns_into_one_read():
+    reqs = [hawk_plan.request(np.s_[:, i], (1024, 3)) for i in range(3)]
+    reads = hawk_plan.plan(reqs, chunk_rows=128)
+    assert len(reads) == 1
+    assert (reads[0].start, reads[0].stop, reads[0].members) == (0, 1024, [0, 1, 2])
+    np.testing.assert_array_equal(reads[0].cols, [0, 1, 2])
+    far = [hawk_plan.request(np.s_[0:10], (1024, 3))]
+    far.append(hawk_plan.request(np.s_[500:510], (1024, 3)))
+    assert len(hawk_plan.plan(far, chunk_rows=128)) == 2
+    assert hawk_plan.request(np.s_[::2], (1024, 3)) is None
+
+
+def test_read_many_matches_single_reads(fst):
+    dset = fst["HS_WN/01/SW_LC1/acc"]
+    sels = [
+        np.s_[:, 0],
+        np.s_[10:500, 1:],
+        np.s_[200:300],
+        np.s_[:, 2],
+        np.s_[7],
+        np.s_[-3:, [0, 2]],
+        np.s_[::4, 1],  # not plannable, read as it is
+    ]
+    for got, sel in zip(dset.read_many(sels), sels):
+        np.testing.assert_array_equal(got, dset[sel])
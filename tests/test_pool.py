@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import hawk
+
+# %% File pool
+
+
+def test_pool_counts_hits_and_misses_and_evicts_at_size(sbw, tmp_path):
+    hawk.prefetch("BR_AR_0[1-3]", str(tmp_path), verbose=False)
+    with hawk.SBW(str(tmp_path), pool_size=2, rdcc_nbytes=1 << 20) as data:
+        pool = data.pool
+        for t in ("01", "02", "01", "01"):
+            data[f"LMS/BR_AR/{t}/EXH/frf"]
+        assert pool.stats() == {
+            "size": 2,
+            "open": 2,
+            "hits": 2,
+            "misses": 2,
+            "evictions": 0,
+            "hit_rate": 0.5,
+        }
+        frf = data["LMS/BR_AR/03/EXH/frf"]  # evicts 02, the least recently used
+        assert pool.stats()["evictions"] == 1
+        assert list(pool._files) == [str(tmp_path / f"BR_AR_0{i}.hdf5") for i in (1, 3)]
+        assert frf.file.id.get_access_plist().get_cache()[2] == 1 << 20
+        data["LMS/BR_AR/02/EXH/frf"]
+        assert pool.stats()["misses"] == 4
+        assert frf[:].shape == frf.shape  # objects outlive the pool's handle
+
+
+def test_pool_reopens_replaced_and_removed_files(sbw, tmp_path):
+    hawk.prefetch("BR_AR_01", str(tmp_path), verbose=False)
+    fname = str(tmp_path / "BR_AR_01.hdf5")
+    with hawk.SBW(str(tmp_path)) as data:
+        first = data["LMS/BR_AR/01/EXH/frf"]
+        # replaced on disk (new inode), e.g. downloaded again by another process
+        shutil.copy(fname, fname + ".new")
+        os.replace(fname + ".new", fname)
+        again = data["LMS/BR_AR/01/EXH/frf"]
+        assert again.file.id != first.file.id
+        assert data.pool.stats()["misses"] == 2
+        # removed (e.g. evicted elsewhere): downloaded again on the next lookup
+        os.remove(fname)
+        assert data["LMS/BR_AR/01/EXH/frf"].shape == first.shape
+        assert os.path.isfile(fname)
+        assert data.pool.stats()["misses"] == 3
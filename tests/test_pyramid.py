@@ -0,0 +1,63 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+
+import hawk_pyramid
+
+
+@pytest.fixture
+def long_file(tmp_path):
+    rng = np.random.default_rng(0)
+    fname = str(tmp_path / "long.hdf5")
+    with h5py.File(fname, "w") as f:
+        f.create_dataset("a/acc", data=rng.normal(size=(10007, 3)), chunks=(500, 3))
+        f.create_dataset("b/acc", data=rng.normal(size=(3001,)))
+        f.create_dataset("b/frf", data=rng.normal(size=(4000, 2)) * 1j + 1)
+    return fname
+
+
+def _brute_force(x, start, step, count):
+    # (min, max, mean) of each block of step rows, the last clipped to the data
+    x = np.abs(x) if np.iscomplexobj(x) else x
+    blocks = [x[i * step : (i + 1) * step] for i in range(start, start + count)]
+    return [np.array([f(b, axis=0) for b in blocks]) for f in (np.min, np.max, np.mean)]
+
+
+# %% Overview
+
+
+@pytest.mark.parametrize("name", ["a/acc", "b/acc", "b/frf"])
+@pytest.mark.parametrize("span", [(None, None), (123, 9000), (2950, 3001)])
+def test_overview_matches_brute_force(long_file, name, span):
+    with h5py.File(long_file, "r") as f:
+        d = f[name]
+        ov = hawk_pyramid.overview(d, *span, max_points=100)
+        x = d[:]
+    r0, r1 = span[0] or 0, min(span[1] or len(x), len(x))
+    assert ov.x[0] <= r0 and ov.x[-1] < r1 <= ov.x[-1] + ov.step
+    assert len(ov.x) <= max(r1 - r0, 100)
+    lo, hi, mean = _brute_force(x, ov.x[0] // ov.step, ov.step, len(ov.x))
+    np.testing.assert_array_equal(ov.min, lo)
+    np.testing.assert_array_equal(ov.max, hi)
+    np.testing.assert_allclose(ov.mean, mean, rtol=1e-12, atol=1e-12)
+
+
+def test_each_dataset_has_its_own_sidecar(long_file):
+    with h5py.File(long_file, "r") as f:
+        hawk_pyramid.build(f["a/acc"])
+        first = hawk_pyramid.sidecar_name(long_file, "/a/acc")
+        before = os.stat(first)
+        assert hawk_pyramid.build_pyramids(f["b"]) == 2
+        after = os.stat(first)
+        assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+        assert sorted(os.listdir(hawk_pyramid.sidecar_dir(long_file) + "/b")) == [
+            "acc.hdf5",
+            "frf.hdf5",
+        ]
+    with h5py.File(long_file, "a") as f:
+        f["a/acc"][0] = 100.0  # a changed source file rebuilds on next use
+    with h5py.File(long_file, "r") as f:
+        assert hawk_pyramid.overview(f["a/acc"], max_points=100).max[0, 0] == 100.0
+    assert os.stat(first).st_ino != before.st_ino
@@ -0,0 +1,88 @@
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+import hawk
+
+TESTS = pd.DataFrame({"testID": ["HS_WN"] * 3, "testNumber": [1, 2, 3]})
+CHANNELS = pd.DataFrame({"sensorID": ["SW_LC1", "PW_LC7"], "signal": ["acc"] * 2})
+
+
+def _slice_reference(data, tests, channels):
+    # slice_from_dfs as it was before the preallocated stack, one dataset at a time
+    out = []
+    paths = tests["testID"] + "/" + tests["testNumber"].astype(str).str.zfill(2)
+    for test in paths:
+        test_out = []
+        for signal, sensor in zip(channels["signal"], channels["sensorID"]):
+            test_out.append(data[test][sensor][signal][:].T)
+        out.append(test_out)
+    nt = max(r.shape[1] for row in out for r in row)
+    nr = max(r.shape[0] for row in out for r in row)
+    arr = np.full((nt, nr, len(out), len(out[0])), np.nan)
+    for i, row in enumerate(out):
+        for j, r in enumerate(row):
+            arr[: r.shape[1], : r.shape[0], i, j] = r.T
+    return arr
+
+
+# %% Stacking
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_slice_from_dfs_matches_reference(fst, workers):
+    arr, lengths = hawk.slice_from_dfs(
+        fst, TESTS, CHANNELS, return_lengths=True, workers=workers
+    )
+    np.testing.assert_array_equal(arr, _slice_reference(fst, TESTS, CHANNELS))
+    assert lengths.tolist() == [[[1024, 3]] * 2] * 2 + [[[1024, 2]] * 2]
+
+
+def test_stack_keeps_the_dtype_when_not_ragged(fst):
+    grid = [["HS_WN/01/SW_LC1/acc", "HS_WN/02/SW_LC7/acc"]]
+    arr, _ = hawk.stack(fst, grid)
+    assert arr.dtype == fst["HS_WN/01/SW_LC1/acc"].dtype
+    np.testing.assert_array_equal(arr[:, :, 0, 1], fst["HS_WN/02/SW_LC7/acc"][:])
+
+
+def test_parallel_stack_is_backed_by_shared_memory(fst):
+    grid = [["HS_WN/01/SW_LC1/acc"], ["HS_WN/03/SW_LC1/acc"]]
+    hawk.index(fst)
+    opened = fst.pool.stats()
+    arr, lengths = hawk.stack(fst, grid, workers=2, rows=slice(10, 20))
+    assert fst.pool.stats() == opened  # shapes came from the index
+    ref, ref_lengths = hawk.stack(fst, grid, rows=slice(10, 20))
+    np.testing.assert_array_equal(arr, ref)
+    np.testing.assert_array_equal(lengths, ref_lengths)
+    assert arr.base is not None and not arr.flags.owndata  # no copy out of the block
+    view = arr[:, 2]  # the third repeat, which HS_WN/03 lacks
+    del arr
+    assert np.isnan(view[:, 1, 0]).all() and not np.isnan(view[:, 0, 0]).any()
+
+
+# %% Memory mapped reads
+
+
+def test_memmap_reads_contiguous_datasets_only(fst, tmp_path):
+    dset = fst["HS_WN/01/SW_LC1/acc"]
+    m = dset.memmap()
+    assert isinstance(m, np.memmap)
+    np.testing.assert_array_equal(m, dset[:])
+    part = dset.read(np.s_[100:200, 1], as_memmap=True)
+    assert isinstance(part, np.memmap)
+    np.testing.assert_array_equal(part, dset[100:200, 1])
+    with h5py.File(tmp_path / "chunked.hdf5", "w") as f:
+        d = f.create_dataset("x", data=np.arange(100.0).reshape(50, 2), chunks=(10, 2))
+        assert hawk.memmap(d) is None
+        got = hawk.read(d, np.s_[5:9], as_memmap=True)
+        assert type(got) is np.ndarray
+        np.testing.assert_array_equal(got, d[5:9])
+
+
+def test_slice_from_dfs_reads_only_the_rows(fst):
+    arr = hawk.slice_from_dfs(fst, TESTS, CHANNELS)
+    for workers in [None, 2]:
+        rows = slice(100, 400)
+        part = hawk.slice_from_dfs(fst, TESTS, CHANNELS, rows=rows, workers=workers)
+        np.testing.assert_array_equal(part, arr[rows])
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pytest
+
+import hawk
+from test_read import CHANNELS, TESTS
+
+# %% Sharding
+
+
+def test_shards_are_deterministic_and_checked():
+    sizes = {f"BR_AR_0{i}": i * 100 for i in range(1, 6)}
+    a = hawk.shards("BR_AR_0[1-5]", 2, sizes=sizes)
+    b = hawk.shards(["BR_AR_05", "BR_AR_0[1-4]"], 2, sizes=sizes)
+    assert [s.keys for s in a] == [sorted(s.keys) for s in a]
+    assert sorted(k for s in a for k in s.keys) == sorted(sizes)
+    assert sorted(s.weight for s in a) == [700, 800]
+    results = [s.result(list(s.selection)) for s in reversed(a)]
+    assert hawk.merge_shards(a, results) == sorted(sizes)
+    assert a[0].plan != b[0].plan  # same keys, different order
+    with pytest.raises(ValueError):
+        hawk.merge_shards(b, results)
+    with pytest.raises(KeyError):
+        hawk.shards("BR_AR_0[1-5]", 2, sizes={"BR_AR_01": 1})
+
+
+def test_merged_shards_match_the_whole_selection(fst):
+    sizes = {"HS_WN_01": 3, "HS_WN_02": 1, "HS_WN_03": 1}
+    parts = hawk.shards(TESTS, 2, sizes=sizes)
+    assert [s.keys for s in parts] == [["HS_WN_01"], ["HS_WN_02", "HS_WN_03"]]
+    results = [
+        s.result(hawk.slice_from_dfs(fst, s.selection, CHANNELS, return_lengths=True))
+        for s in parts
+    ]
+    arr, lengths = hawk.merge_shards(parts, results, axis=(2, 0))
+    ref, ref_lengths = hawk.slice_from_dfs(fst, TESTS, CHANNELS, return_lengths=True)
+    np.testing.assert_array_equal(arr, ref)
+    np.testing.assert_array_equal(lengths, ref_lengths)
+
+
+def test_shard_prefetches_only_its_series(sbw, tmp_path):
+    parts = hawk.shards("BR_AR_0[1-3]", 2)
+    assert parts[1].prefetch(str(tmp_path), verbose=False) == parts[1].keys
+    downloaded = sorted(n[:-5] for n in os.listdir(tmp_path) if n.endswith(".hdf5"))
+    assert downloaded == parts[1].keys
@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+
+import hawk
+import hawk_stats
+
+# %% Instrumentation
+
+
+def test_instrument_records_counters_timings_and_trace(fst, tmp_path):
+    grid = [["HS_WN/01/SW_LC1/acc", "HS_WN/02/SW_LC1/acc"]]
+    trace_file = tmp_path / "trace.json"
+    stats_file = tmp_path / "stats.json"
+    with hawk.instrument(stats_file=stats_file, trace_file=trace_file) as stats:
+        arr, _ = hawk.stack(fst, grid)
+        fst["HS_WN/01/SW_LC7/acc"][:10]
+    assert not hawk_stats.on
+    assert stats["counters"]["bytes_read"] == arr.nbytes + 10 * 3 * 8
+    assert stats["bytes_read"]["HS_WN_01.hdf5:/SW_LC1/acc"] == 1024 * 3 * 8
+    assert stats["timings"]["stack"]["count"] == 1
+    assert stats["timings"]["lookup"]["count"] == 3
+    assert sum(stats["timings"]["lookup"]["hist_us"].values()) == 3
+    with open(stats_file) as f:
+        assert json.load(f)["counters"] == stats["counters"]
+    with open(trace_file) as f:
+        events = json.load(f)["traceEvents"]
+    assert {e["name"] for e in events} >= {"stack", "lookup"}
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+
+def test_read_direct_counts_the_destination_bytes(fst):
+    dset = fst["HS_WN/01/SW_LC1/acc"]
+    out = np.zeros((50, 4))
+    with hawk.instrument() as stats:
+        dset.read_direct(out, np.s_[100:150, 1], np.s_[:, 2])
+        dset.read_direct(out, np.s_[:50], np.s_[:, :3])
+    assert stats["counters"]["bytes_read"] == 50 * 8 + 50 * 3 * 8
+    np.testing.assert_array_equal(out[:, 2], dset[:50, 2])
+
+
+def test_nothing_is_recorded_while_disabled(fst):
+    hawk_stats.reset()
+    fst["HS_WN/01/SW_LC1/acc"][:]
+    assert hawk_stats.stats()["counters"] == {}
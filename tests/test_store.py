@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+
+import hawk
+import hawk_store
+
+# %% Consolidated store
+
+
+def test_consolidate_keeps_paths_data_and_metadata(sbw, tmp_path):
+    with hawk.SBW(str(tmp_path)) as data:
+        frf = data["LMS/BR_AR/01/EXH/frf"]
+        before, meta = frf[:], frf.setup()
+    out = hawk.consolidate(str(tmp_path))
+    assert out == str(tmp_path / "SBW_store.hdf5")
+    with hawk.SBW(str(tmp_path)) as store:
+        assert store.file.filename == out
+        frf = store["LMS/BR_AR/01/EXH/frf"]
+        assert frf.file.filename == out  # no external file behind it any more
+        np.testing.assert_array_equal(frf[:], before)
+        assert frf.setup() == meta
+        assert frf.chunks == hawk_store.auto_chunks(frf.shape, frf.dtype)
+        # series that weren't downloaded stay links and download on access
+        assert not (tmp_path / "BR_AR_02.hdf5").exists()
+        assert store["LMS/BR_AR/02/EXH/frf"].shape == frf.shape
+        assert os.path.isfile(tmp_path / "BR_AR_02.hdf5")
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import h5py
+import numpy as np
+import pytest
+
+from hawk_stream import cpsd, iter_blocks, stream
+
+
+@pytest.fixture
+def signals(tmp_path):
+    rng = np.random.default_rng(0)
+    with h5py.File(tmp_path / "signals.hdf5", "w") as f:
+        f.create_dataset("x", data=rng.standard_normal((5000, 3)), chunks=(64, 3))
+        f.create_dataset("y", data=rng.standard_normal(5000), chunks=(100,))
+        yield f
+
+
+# %% Streaming
+
+
+@pytest.mark.parametrize("window, hop", [(256, None), (256, 100), (100, 333)])
+def test_stream_windows_match_slicing(signals, window, hop, monkeypatch):
+    monkeypatch.setattr("hawk_stream.block_bytes", 4096)  # many small blocks
+    x = signals["x"]
+    step = window if hop is None else hop
+    starts = range(0, x.shape[0] - window + 1, step)
+    got = list(stream(x, window, hop, repeats=1))
+    assert len(got) == len(starts)
+    for w, start in zip(got, starts):
+        np.testing.assert_array_equal(w, x[start : start + window, 1])
+    means = list(stream(signals["y"], window, hop, func=np.mean))
+    np.testing.assert_allclose(
+        means, [signals["y"][s : s + window].mean() for s in starts]
+    )
+
+
+def test_closing_a_stream_early_stops_its_reader(signals):
+    before = threading.active_count()
+    for _ in range(3):
+        # 3 blocks: after the first is taken the other two fill the queue, and
+        # the reader is left with the end marker to put
+        blocks = iter_blocks(signals["y"], 2000, readahead=2)
+        next(blocks)
+        time.sleep(0.05)
+        blocks.close()
+    deadline = time.monotonic() + 2
+    while threading.active_count() > before and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == before
+
+
+# %% Spectra
+
+
+def test_cpsd_matches_scipy(signals):
+    signal = pytest.importorskip("scipy.signal")
+    x, y = signals["x"], signals["y"]
+    f, Pxy = cpsd([x, y], 512, fs=2048, repeat=2)
+    a, b = x[:, 2], y[:]
+    for i, u in enumerate([a, b]):
+        for j, v in enumerate([a, b]):
+            f_ref, ref = signal.csd(u, v, fs=2048, nperseg=512)
+            np.testing.assert_allclose(f, f_ref)
+            np.testing.assert_allclose(Pxy[:, i, j], ref, rtol=1e-10, atol=1e-14)
+
+
+def test_cpsd_rejects_records_shorter_than_nperseg(signals):
+    with pytest.raises(ValueError, match="nperseg"):
+        cpsd([signals["y"]], 8192)
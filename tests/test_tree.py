@@ -0,0 +1,49 @@
+import hawk
+from conftest import counters
+
+# %% Metadata
+
+
+def test_setup_merges_inherited_attrs_and_is_memoised(sbw, tmp_path):
+    with hawk.SBW(str(tmp_path)) as data:
+        frf = data["LMS/BR_AR/01/EXH/frf"]
+        meta, stats = counters(frf.setup)
+        series = data["LMS/BR_AR/01"]
+        assert meta["units"] == "g/N" and meta["measurement"] == "FRF"
+        assert meta["addedMassg"] == series.attrs["addedMassg"]
+        assert stats.get("attrs_cache.misses", 0) > 0
+        again, stats = counters(frf.setup)
+        assert again == meta
+        assert stats == {"attrs_cache.hits": 1}
+        desc = frf.describe()
+        assert desc["testCampaign"] == "LMS" and desc["sensorID"] == "EXH"
+        assert desc["units"] == "g/N"
+        tree = hawk.setup_tree(series)
+        assert tree["LMS/BR_AR/01/EXH/frf"] == meta
+
+
+# %% Tree walks
+
+
+def test_iter_tree_never_downloads(sbw, tmp_path):
+    with hawk.SBW(str(tmp_path)) as data:
+        entries = list(hawk.iter_tree(data["LMS"], depth=2))
+        assert ("LMS/BR_AR/01", "external", "(undownloaded)") in entries
+        assert not (tmp_path / "BR_AR_01.hdf5").exists()
+        assert list(hawk.iter_tree(data, pattern="LMS/xData/*")) == [
+            ("LMS/xData/freq", "dataset", "Dataset: freq (Hz) (201,)")
+        ]
+
+
+def test_iter_tree_pages_and_index_agree(sbw, tmp_path):
+    with hawk.SBW(str(tmp_path)) as data:
+        data["LMS/BR_AR/02/EXH/frf"]  # download one series
+        walked = list(hawk.iter_tree(data["LMS/BR_AR/02"]))
+        hawk.index(data)
+        indexed = list(hawk.iter_tree(data["LMS/BR_AR/02"]))
+        assert sorted(walked) == sorted(indexed)
+        assert ("LMS/BR_AR/02/EXH/frf", "dataset") == indexed[1][:2]
+        pages = [list(hawk.iter_tree(data, limit=3, page=p)) for p in range(50)]
+        assert sum(pages, []) == list(hawk.iter_tree(data))
+        tree = data["LMS/BR_AR/02"].explore()
+        assert "LMS/BR_AR/02/EXH/frf" in tree["LMS/BR_AR/02"]["LMS/BR_AR/02/EXH"]